@@ -0,0 +1,444 @@
+import os
+import random
+import time
+import timeit
+import tracemalloc
+import equation_utils
+import calculator_utils
+import simul_equation_utils
+
+
+BENCHMARK_EXPRESSIONS = [
+    "2*π*x+sin(2*π*x)",
+    "x^3-2x+1",
+    "sqrt(x^2+1)/(x+3)",
+    "3cos(x)^2-(x-1)(x+2)/5"
+]
+
+BENCHMARK_EQUATIONS = [
+    "x^3-2x+1=0",
+    "sin(x)=0.5",
+    "sin(10x)=0",
+    "sin(100x)=0",
+    "x^2=0",
+    "cos(x)=x"
+]
+
+SOLVE_METHODS = {
+    "newton" : equation_utils.ArbitraryEquation.NEWTON_METHOD,
+    "bracketing" : equation_utils.ArbitraryEquation.BRACKETING_METHOD,
+    "vectorised" : equation_utils.ArbitraryEquation.VECTORISED_METHOD,
+    "polynomial" : equation_utils.ArbitraryEquation.POLYNOMIAL_METHOD,
+    "adaptive" : equation_utils.ArbitraryEquation.ADAPTIVE_METHOD
+}
+
+SOLUTION_MIN_X = -100
+SOLUTION_MAX_X = 100
+
+BENCHMARK_IMPLICIT_EQUATIONS = [
+    "x^2+y^2=25",
+    "y^2=x",
+    "sin(y)=x/5",
+    "xy=1"
+]
+
+#the implicit graphs are solved for y in each column, like ImplicitGraph on the default axis
+IMPLICIT_MIN = -10
+IMPLICIT_MAX = 10
+IMPLICIT_COLUMNS = 200
+
+#an expensive equation to solve, used to see how solving scales with more worker processes
+PARALLEL_EQUATION = "sin(100x)=0"
+PARALLEL_SOLVE_METHOD = equation_utils.ArbitraryEquation.ADAPTIVE_METHOD
+
+#the number of unknowns in the random simultaneous equations that are solved
+SYSTEM_SIZES = [2, 6, 10, 50, 100, 200]
+
+#the sizes of the matrices used to compare cofactor expansion with elimination. 
+#the cofactor inverse finds a determinant for every minor, so it is only timed up to a smaller size
+MATRIX_SIZES = range(2, 11)
+COFACTOR_INVERSE_MAX_SIZE = 8
+
+#the number of lists of constants solved at once with the same coefficients
+NUM_BATCH_CONSTANTS = 100
+
+NUM_EVALUATIONS = 10000
+NUM_MEMORY_EXPRESSIONS = 1000
+
+
+def time_per_evaluation(function):
+    #return the average time (in microseconds) taken to call the function once
+    total_time = timeit.timeit(function, number=NUM_EVALUATIONS)
+
+    return total_time / NUM_EVALUATIONS * 1e6
+
+
+def benchmark_compiled_expressions():
+    print("Expression evaluation (microseconds per evaluation)")
+    print(f"{'expression':<28}{'interpreted':>14}{'compiled':>14}{'speedup':>10}")
+
+    for expression_string in BENCHMARK_EXPRESSIONS:
+        expression = calculator_utils.AlgebraicInfixExpression(expression_string)
+        compiled_function = expression.compile()
+
+        interpreted_time = time_per_evaluation(lambda: expression.evaluate({"x" : 1.5}))
+        compiled_time = time_per_evaluation(lambda: compiled_function(x=1.5))
+
+        speedup = interpreted_time / compiled_time
+
+        print(f"{expression_string:<28}{interpreted_time:>14.3f}{compiled_time:>14.3f}{speedup:>9.1f}x")
+
+
+def benchmark_expression_cache():
+    print("Expression parsing (microseconds per parse)")
+    print(f"{'expression':<28}{'uncached':>14}{'cached':>14}{'speedup':>10}")
+
+    calculator_utils.EXPRESSION_CACHE.clear()
+
+    for expression_string in BENCHMARK_EXPRESSIONS:
+        uncached_time = time_per_evaluation(lambda: calculator_utils.AlgebraicInfixExpression(expression_string))
+        cached_time = time_per_evaluation(lambda: calculator_utils.get_expression(expression_string))
+
+        speedup = uncached_time / cached_time
+
+        print(f"{expression_string:<28}{uncached_time:>14.3f}{cached_time:>14.3f}{speedup:>9.1f}x")
+
+    hits = calculator_utils.EXPRESSION_CACHE.get_hits()
+    misses = calculator_utils.EXPRESSION_CACHE.get_misses()
+
+    print(f"cache hits: {hits}, misses: {misses}")
+
+
+def benchmark_expression_memory():
+    print("Expression memory (bytes per parsed expression)")
+    print(f"{'expression':<28}{'parsed':>14}{'compact':>14}")
+
+    for expression_string in BENCHMARK_EXPRESSIONS:
+        tracemalloc.start()
+        expressions = [calculator_utils.AlgebraicInfixExpression(expression_string) 
+                       for _ in range(NUM_MEMORY_EXPRESSIONS)]
+        total_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        #the compact form is the only part of the parsed expression kept after parsing,
+        #so this counts everything allocated for it, not just the opcode and constant buffers
+        postfix_expression = expressions[0].covert_to_postfix()
+
+        tracemalloc.start()
+        compact_expressions = [calculator_utils.CompactExpression(postfix_expression) 
+                               for _ in range(NUM_MEMORY_EXPRESSIONS)]
+        compact_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        print(f"{expression_string:<28}{total_memory / NUM_MEMORY_EXPRESSIONS:>14.0f}"
+              f"{compact_memory / NUM_MEMORY_EXPRESSIONS:>14.0f}")
+
+
+def benchmark_expression_optimisation():
+    print("Expression graph optimisation (operations per evaluation)")
+    print(f"{'expression':<28}{'nodes':>14}{'operations':>14}")
+
+    for expression_string in BENCHMARK_EXPRESSIONS:
+        expression = calculator_utils.AlgebraicInfixExpression(expression_string)
+        report = expression.get_expression_graph().get_optimisation_report()
+
+        nodes = f"{report['nodes_before']} -> {report['nodes_after']}"
+        operations = f"{report['operations_before']} -> {report['operations_after']}"
+
+        print(f"{expression_string:<28}{nodes:>14}{operations:>14}")
+
+
+def benchmark_equation_solving():
+    print(f"Equation solving for {SOLUTION_MIN_X}<x<{SOLUTION_MAX_X} (solutions, evaluations, milliseconds)")
+    print(f"{'equation':<20}{'method':<14}{'solutions':>10}{'evaluations':>13}{'time':>10}")
+
+    for equation_string in BENCHMARK_EQUATIONS:
+        lhs, rhs = equation_string.split("=")
+
+        for method_name, solve_method in SOLVE_METHODS.items():
+            equation_solver = equation_utils.ArbitraryEquation(calculator_utils.get_expression(lhs), 
+                                                               calculator_utils.get_expression(rhs), 
+                                                               "x", 
+                                                               False)
+            equation_solver.set_solve_method(solve_method)
+
+            start_time = time.perf_counter()
+            solutions = equation_solver.find_all_solutions(SOLUTION_MIN_X, SOLUTION_MAX_X, {})
+            time_taken = (time.perf_counter() - start_time) * 1000
+
+            evaluations = equation_solver.get_evaluation_count()
+
+            print(f"{equation_string:<20}{method_name:<14}{len(solutions):>10}{evaluations:>13}{time_taken:>10.1f}")
+
+
+def get_fixed_iterations(equation_solver):
+    #the Newton-Raphson iterations the last solve would have used without stopping early
+    starts = sum(equation_solver.get_status_count(status) for status in range(3))
+
+    return starts * equation_solver.newton_raphson_steps
+
+
+def count_implicit_iterations(equation_solver, columns):
+    #return the Newton-Raphson iterations used (and the number used without stopping
+    #early) by solving the equation in every column, like ImplicitGraph does
+    iterations = 0
+    fixed_iterations = 0
+
+    for known_variable_substitutions in columns:
+        try:
+            equation_solver.find_all_solutions(IMPLICIT_MIN, IMPLICIT_MAX, known_variable_substitutions)
+        except Exception:
+            pass
+
+        iterations += equation_solver.get_iteration_count()
+        fixed_iterations += get_fixed_iterations(equation_solver)
+
+    return iterations, fixed_iterations
+
+
+def benchmark_solution_cache():
+    print("Equation mode solving (milliseconds per solve)")
+    print(f"{'equation':<20}{'uncached':>14}{'cached':>14}")
+
+    equation_utils.SOLUTION_CACHE.clear()
+
+    for equation_string in BENCHMARK_EQUATIONS:
+        start_time = time.perf_counter()
+        equation_utils.solve_equation(equation_string, SOLUTION_MIN_X, SOLUTION_MAX_X)
+        uncached_time = (time.perf_counter() - start_time) * 1000
+
+        #the solutions are now in the cache, so solving again just looks them up
+        start_time = time.perf_counter()
+        equation_utils.solve_equation(equation_string, SOLUTION_MIN_X, SOLUTION_MAX_X)
+        cached_time = (time.perf_counter() - start_time) * 1000
+
+        print(f"{equation_string:<20}{uncached_time:>14.3f}{cached_time:>14.3f}")
+
+    hits = equation_utils.SOLUTION_CACHE.get_hits()
+    misses = equation_utils.SOLUTION_CACHE.get_misses()
+
+    print(f"cache hits: {hits}, misses: {misses}")
+
+
+def benchmark_newton_iterations():
+    print("Newton-Raphson iterations (fixed number of steps -> stopping early)")
+    print(f"{'equation':<20}{'mode':<14}{'iterations':>22}")
+
+    for equation_string in BENCHMARK_EQUATIONS:
+        lhs, rhs = equation_string.split("=")
+
+        equation_solver = equation_utils.ArbitraryEquation(calculator_utils.get_expression(lhs), 
+                                                           calculator_utils.get_expression(rhs), 
+                                                           "x", 
+                                                           False)
+        equation_solver.find_all_solutions(SOLUTION_MIN_X, SOLUTION_MAX_X, {})
+
+        iterations = f"{get_fixed_iterations(equation_solver)} -> {equation_solver.get_iteration_count()}"
+
+        print(f"{equation_string:<20}{'equation':<14}{iterations:>22}")
+
+    column_step = (IMPLICIT_MAX - IMPLICIT_MIN) / IMPLICIT_COLUMNS
+    columns = [{"x" : IMPLICIT_MIN + column * column_step} for column in range(IMPLICIT_COLUMNS)]
+
+    for equation_string in BENCHMARK_IMPLICIT_EQUATIONS:
+        lhs, rhs = equation_string.split("=")
+
+        equation_solver = equation_utils.ArbitraryEquation(calculator_utils.get_expression(lhs), 
+                                                           calculator_utils.get_expression(rhs), 
+                                                           "y", 
+                                                           True)
+        iterations, fixed_iterations = count_implicit_iterations(equation_solver, columns)
+        iterations = f"{fixed_iterations} -> {iterations}"
+
+        print(f"{equation_string:<20}{'implicit graph':<14}{iterations:>22}")
+
+
+def benchmark_parallel_solving():
+    print(f"Parallel solving of {PARALLEL_EQUATION} (adaptive) for {SOLUTION_MIN_X}<x<{SOLUTION_MAX_X}")
+    print(f"{'workers':<20}{'solutions':>10}{'time':>10}{'speedup':>10}")
+
+    lhs, rhs = PARALLEL_EQUATION.split("=")
+
+    serial_time = None
+    for workers in range(1, os.cpu_count() + 1):
+        equation_solver = equation_utils.ArbitraryEquation(calculator_utils.get_expression(lhs), 
+                                                           calculator_utils.get_expression(rhs), 
+                                                           "x", 
+                                                           False)
+        equation_solver.set_solve_method(PARALLEL_SOLVE_METHOD)
+        equation_solver.set_workers(workers)
+
+        if workers > 1:
+            #start the worker processes first, so the time taken to start them is not included
+            equation_utils.get_process_pool(workers).submit(int).result()
+
+        start_time = time.perf_counter()
+        solutions = equation_solver.find_all_solutions(SOLUTION_MIN_X, SOLUTION_MAX_X, {})
+        time_taken = (time.perf_counter() - start_time) * 1000
+
+        if serial_time is None: serial_time = time_taken
+
+        print(f"{workers:<20}{len(solutions):>10}{time_taken:>10.1f}{serial_time / time_taken:>9.1f}x")
+
+
+def build_random_system(size):
+    #return random equations with a known solution, so the error in the solution can be measured
+    equation_variables = [[random.uniform(-10, 10) for _ in range(size)] for _ in range(size)]
+    known_solution = [random.uniform(-10, 10) for _ in range(size)]
+
+    equation_constants = [sum(coefficient * value for coefficient, value in zip(variables, known_solution)) 
+                          for variables in equation_variables]
+
+    return simul_equation_utils.SystemEquations(equation_variables, equation_constants), known_solution
+
+
+def benchmark_simultaneous_equations():
+    print("Simultaneous equation solving with LU decomposition (milliseconds, largest error)")
+    print(f"{'unknowns':<20}{'time':>10}{'error':>14}")
+
+    for size in SYSTEM_SIZES:
+        equation_system, known_solution = build_random_system(size)
+
+        start_time = time.perf_counter()
+        solutions = equation_system.solve()
+        time_taken = (time.perf_counter() - start_time) * 1000
+
+        error = max(abs(solution - value) for solution, value in zip(solutions, known_solution))
+
+        print(f"{size:<20}{time_taken:>10.2f}{error:>14.2e}")
+
+
+def benchmark_factorisation_cache():
+    print("Simultaneous equations with new constants (milliseconds per solve)")
+    print(f"{'unknowns':<20}{'uncached':>14}{'cached':>14}{'batch':>14}")
+
+    simul_equation_utils.FACTORISATION_CACHE.clear()
+
+    for size in SYSTEM_SIZES:
+        equation_system, _ = build_random_system(size)
+        equation_system.set_use_factorisation_cache(True)
+
+        uncached_time = time_once(equation_system.solve)
+
+        #a new system with the same coefficients (like the next solve in Simultaneous Equation mode), 
+        #so its decomposition is found in the cache rather than in the system's own memo
+        new_constants = [random.uniform(-10, 10) for _ in range(size)]
+        cached_system = simul_equation_utils.SystemEquations(equation_system.equation_variables, new_constants)
+        cached_system.set_use_factorisation_cache(True)
+
+        cached_time = time_once(cached_system.solve)
+
+        constant_lists = [[random.uniform(-10, 10) for _ in range(size)] for _ in range(NUM_BATCH_CONSTANTS)]
+        batch_time = time_once(lambda: cached_system.solve_many(constant_lists)) / NUM_BATCH_CONSTANTS
+
+        print(f"{size:<20}{uncached_time:>14.3f}{cached_time:>14.3f}{batch_time:>14.3f}")
+
+    hits = simul_equation_utils.FACTORISATION_CACHE.get_hits()
+    misses = simul_equation_utils.FACTORISATION_CACHE.get_misses()
+
+    print(f"cache hits: {hits}, misses: {misses}")
+
+
+def benchmark_rank_one_updates():
+    print("Simultaneous equations with one changed coefficient (milliseconds per solve)")
+    print(f"{'unknowns':<20}{'factorised':>14}{'updated':>14}{'error':>14}")
+
+    for size in SYSTEM_SIZES:
+        previous_system, _ = build_random_system(size)
+        previous_system.solve()
+
+        equation_variables = [list(variables) for variables in previous_system.equation_variables]
+        equation_variables[size // 2][size // 2] += random.uniform(-10, 10)
+
+        factorised_system = simul_equation_utils.SystemEquations(equation_variables, previous_system.equation_constants)
+        factorised_time = time_once(factorised_system.solve)
+
+        updated_system = simul_equation_utils.SystemEquations(equation_variables, previous_system.equation_constants)
+        updated_system.set_previous_system(previous_system)
+        updated_time = time_once(updated_system.solve)
+
+        error = max(abs(factorised_solution - updated_solution) 
+                    for factorised_solution, updated_solution in zip(factorised_system.solve(), updated_system.solve()))
+
+        print(f"{size:<20}{factorised_time:>14.3f}{updated_time:>14.3f}{error:>14.2e}")
+
+
+def time_once(function):
+    #return the time (in milliseconds) taken to call the function once
+    start_time = time.perf_counter()
+    function()
+
+    return (time.perf_counter() - start_time) * 1000
+
+
+def benchmark_matrix_memory():
+    print("Matrix memory (bytes per matrix)")
+    print(f"{'size':<20}{'nested lists':>14}{'array':>14}")
+
+    for size in SYSTEM_SIZES:
+        items = [[random.uniform(-10, 10) for _ in range(size)] for _ in range(size)]
+
+        tracemalloc.start()
+        #copy every float, so the nested lists hold their own float objects like parsed coefficients would
+        nested_items = [[item * 1.0 for item in row] for row in items]
+        nested_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        matrix = simul_equation_utils.SquareMatrix(items)
+        array_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        print(f"{size:<20}{nested_memory:>14}{array_memory:>14}")
+
+
+def benchmark_matrix_operations():
+    print("Determinant and inverse, cofactor expansion -> elimination (milliseconds)")
+    print(f"{'size':<20}{'determinant':>26}{'inverse':>26}")
+
+    for size in MATRIX_SIZES:
+        matrix = simul_equation_utils.SquareMatrix([[random.uniform(-10, 10) for _ in range(size)] 
+                                                    for _ in range(size)])
+
+        determinant_times = f"{time_once(matrix.cofactor_determinant):.3f} -> {time_once(matrix.determinant):.3f}"
+
+        if size <= COFACTOR_INVERSE_MAX_SIZE:
+            cofactor_inverse_time = f"{time_once(matrix.cofactor_inverse):.3f}"
+        else:
+            cofactor_inverse_time = "-"
+
+        inverse_times = f"{cofactor_inverse_time} -> {time_once(matrix.inverse):.3f}"
+
+        print(f"{size:<20}{determinant_times:>26}{inverse_times:>26}")
+
+
+def main():
+    benchmark_compiled_expressions()
+    print()
+    benchmark_expression_cache()
+    print()
+    benchmark_expression_memory()
+    print()
+    benchmark_expression_optimisation()
+    print()
+    benchmark_equation_solving()
+    print()
+    benchmark_solution_cache()
+    print()
+    benchmark_newton_iterations()
+    print()
+    benchmark_parallel_solving()
+    print()
+    benchmark_simultaneous_equations()
+    print()
+    benchmark_matrix_operations()
+    print()
+    benchmark_matrix_memory()
+    print()
+    benchmark_factorisation_cache()
+    print()
+    benchmark_rank_one_updates()
+
+
+if __name__ == "__main__":
+    main()
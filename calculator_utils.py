@@ -1,8 +1,51 @@
+import re
 import math
+import array
+import operator
+import threading
+import collections
+
+try:
+    import numpy
+except ImportError:
+    #numpy is only needed to evaluate expressions over whole arrays at once
+    numpy = None
 
 
 DIGITS = "0123456789"
 
+EXPRESSION_CACHE_SIZE = 256  #the number of parsed expressions kept by the expression cache
+
+MAX_POLYNOMIAL_DEGREE = 100  #higher powers are not treated as polynomials (like x^1000000)
+
+ARRAYS_SUPPORTED = numpy is not None
+
+#python source used for each operator when compiling an expression. Arrays use
+#functions for / and ^ so errors (like dividing by 0) become NaN instead
+SCALAR_OPERATOR_SOURCE = {
+    "+" : "{0} + {1}",
+    "-" : "{0} - {1}",
+    "*" : "{0} * {1}",
+    "/" : "{0} / {1}",
+    "^" : "{0} ** {1}"
+}
+
+OPERATOR_FUNCTIONS = {
+    "+" : operator.add,
+    "-" : operator.sub,
+    "*" : operator.mul,
+    "/" : operator.truediv,
+    "^" : operator.pow
+}
+
+ARRAY_OPERATOR_SOURCE = {
+    "+" : "{0} + {1}",
+    "-" : "{0} - {1}",
+    "*" : "{0} * {1}",
+    "/" : "_divide({0}, {1})",
+    "^" : "_power({0}, {1})"
+}
+
 
 class Stack:
     def __init__(self):
@@ -35,7 +78,8 @@ class Token:
         "sin" : math.sin,
         "cos" : math.cos,
         "tan" : math.tan,
-        "sqrt" : math.sqrt
+        "sqrt" : math.sqrt,
+        "ln" : math.log
     }
 
     CONSTANTS = {
@@ -51,10 +95,17 @@ class Token:
     ALGEBRA_TERM_TYPE = 4
     CONSTANT_TYPE = 5
 
+    #tokens do not need a __dict__, which makes each token much smaller in memory
+    __slots__ = ("string", "type", "value")
+
     def __init__(self):
         self.string = ""
         self.type = None
 
+        #the numerical value of number and constant tokens, worked out once when
+        #the token is complete so it is not re-parsed every time it is evaluated
+        self.value = None
+
     is_number = lambda self: self.type == Token.NUMBER_TYPE
     is_constant = lambda self: self.type == Token.CONSTANT_TYPE
     is_operator = lambda self: self.type == Token.OPERATOR_TYPE
@@ -64,10 +115,20 @@ class Token:
     is_close_bracket = lambda self: self.type == Token.BRACKET_TYPE and self.string == ")"
 
     def get_number(self):
+        if self.is_number() or self.is_constant():
+            return self.value
+        
+    def calculate_value(self):
+        #called once the token is complete to work out its numerical value
         if self.is_number():
-            return float(self.string)
+            try:
+                self.value = float(self.string)
+            except ValueError:
+                #the number is invalid (like 1.2.3). The value is left as None
+                #so the error is only given when the expression is evaluated
+                self.value = None
         elif self.is_constant():
-            return Token.CONSTANTS[self.string]
+            self.value = Token.CONSTANTS[self.string]
         
     def get_precedence(self):
         if not self.is_operator():
@@ -83,155 +144,909 @@ class Token:
         
         return self.string
 
-    def get_char_type(self, string):
-        if string in Token.OPERATOR_PRECEDENCE.keys():
-            return Token.OPERATOR_TYPE
-        elif string == "(" or string == ")":
-            return Token.BRACKET_TYPE
-        elif string in DIGITS or string == ".":
-            return Token.NUMBER_TYPE
-        elif string in Token.ALGEBRA_TERMS:
-            return Token.ALGEBRA_TERM_TYPE
-        elif string in Token.CONSTANTS.keys():
-            return Token.CONSTANT_TYPE
-        else:
-            return Token.FUNCTION_TYPE  #this must be the start of a function (like the 's' from 'sin')
-            
-    def is_one_char_token(self):
-        #return whether this token is only supposed to be one character long
-        multiple_char_tokens = [Token.NUMBER_TYPE, Token.FUNCTION_TYPE]
+    def set_token(self, string, token_type):
+        self.string = string
+        self.type = token_type
 
-        return self.type not in multiple_char_tokens
+        self.calculate_value()
             
     def set_number(self, num):
         #set this token to be a number
         self.string = str(num)
         self.type = Token.NUMBER_TYPE
+        self.value = float(num)
 
-    def set_algebra_term(self, term_name):
-        #set this token to be a number
-        self.string = term_name
-        self.type = Token.ALGEBRA_TERM_TYPE
 
-    def add_char(self, new_char):
-        #check whether the new_char should be added to the token. If so, add it.
-        #Return whether the char has been added
-        if self.string == "":
-            self.string = new_char
-            self.type = self.get_char_type(self.string)
 
-            return True
+def build_token_regex():
+    #each type of token has its own named group in the regex, so the name of the group
+    #that matched gives the type of the token. Any other characters must be part of
+    #a function name (like the 's' from 'sin')
+    escape_chars = lambda chars: "".join(re.escape(char) for char in chars)
+
+    number_chars = DIGITS + "."
+    operator_chars = "".join(Token.OPERATOR_PRECEDENCE.keys())
+    algebra_term_chars = "".join(Token.ALGEBRA_TERMS)
+    constant_chars = "".join(Token.CONSTANTS.keys())
+
+    all_chars = number_chars + operator_chars + "()" + algebra_term_chars + constant_chars
+
+    group_patterns = [
+        f"(?P<number>[{escape_chars(number_chars)}]+)",
+        f"(?P<operator>[{escape_chars(operator_chars)}])",
+        r"(?P<bracket>[()])",
+        f"(?P<algebra_term>[{escape_chars(algebra_term_chars)}])",
+        f"(?P<constant>[{escape_chars(constant_chars)}])",
+        f"(?P<function>[^{escape_chars(all_chars)}]+)"
+    ]
+
+    return re.compile("|".join(group_patterns))
+
+
+TOKEN_REGEX = build_token_regex()
+
+TOKEN_GROUP_TYPES = {
+    "number" : Token.NUMBER_TYPE,
+    "operator" : Token.OPERATOR_TYPE,
+    "bracket" : Token.BRACKET_TYPE,
+    "algebra_term" : Token.ALGEBRA_TERM_TYPE,
+    "constant" : Token.CONSTANT_TYPE,
+    "function" : Token.FUNCTION_TYPE
+}
+
+
+class DualNumber:
+    #a number a+bε where ε^2=0. Evaluating an expression with x=DualNumber(x, 1) gives
+    #DualNumber(f(x), f'(x)), so the exact derivative is found in the same pass as the value
+    __slots__ = ("value", "derivative")
+
+    def __init__(self, value, derivative):
+        self.value = value
+        self.derivative = derivative
+
+    def __add__(self, other):
+        if isinstance(other, DualNumber):
+            return DualNumber(self.value + other.value, self.derivative + other.derivative)
+        
+        return DualNumber(self.value + other, self.derivative)
+    
+    def __radd__(self, other):
+        return DualNumber(other + self.value, self.derivative)
+    
+    def __sub__(self, other):
+        if isinstance(other, DualNumber):
+            return DualNumber(self.value - other.value, self.derivative - other.derivative)
+        
+        return DualNumber(self.value - other, self.derivative)
+    
+    def __rsub__(self, other):
+        return DualNumber(other - self.value, -self.derivative)
+    
+    def __mul__(self, other):
+        if isinstance(other, DualNumber):
+            #product rule
+            return DualNumber(self.value * other.value, 
+                              self.derivative * other.value + self.value * other.derivative)
+        
+        return DualNumber(self.value * other, self.derivative * other)
+    
+    def __rmul__(self, other):
+        return DualNumber(other * self.value, other * self.derivative)
+    
+    def __truediv__(self, other):
+        if isinstance(other, DualNumber):
+            #quotient rule
+            quotient = self.value / other.value
+            return DualNumber(quotient, (self.derivative - quotient * other.derivative) / other.value)
+        
+        return DualNumber(self.value / other, self.derivative / other)
+    
+    def __rtruediv__(self, other):
+        quotient = other / self.value
+        return DualNumber(quotient, -quotient * self.derivative / self.value)
+    
+    def __pow__(self, other):
+        if isinstance(other, DualNumber):
+            #d(a^b) = a^b * (db*ln(a) + b*da/a)
+            power = self.value ** other.value
+            derivative = power * (other.derivative * math.log(self.value) + 
+                                  other.value * self.derivative / self.value)
+            
+            return DualNumber(power, derivative)
         
-        type_of_char = self.get_char_type(new_char)
+        #d(a^n) = n*a^(n-1)*da
+        return DualNumber(self.value ** other, other * self.value ** (other - 1) * self.derivative)
+    
+    def __rpow__(self, other):
+        #d(n^b) = n^b*ln(n)*db
+        power = other ** self.value
+        return DualNumber(power, power * math.log(other) * self.derivative)
+    
+    def apply_function(self, function, derivative_function):
+        #chain rule
+        return DualNumber(function(self.value), derivative_function(self.value) * self.derivative)
+    
+
+def create_dual_function(function, derivative_function):
+    #return a version of the function which also works on dual numbers
+    def dual_function(argument):
+        if isinstance(argument, DualNumber):
+            return argument.apply_function(function, derivative_function)
+        
+        return function(argument)
+    
+    return dual_function
 
-        #if the char is a different token type or the current token should only be
-        #1 char long (open bracket, close bracket, operator, term), this char is a
-        #completely new token and should not be added
-        one_char_token = self.is_one_char_token()
-        should_add_char = type_of_char == self.type and not one_char_token
 
-        if should_add_char:
-            self.string += new_char
+class Interval:
+    #a range of numbers low <= n <= high. Evaluating an expression with intervals gives an interval
+    #that is guaranteed to contain every value the expression can take for those inputs. Each result
+    #is rounded outwards by one float so rounding errors cannot make the interval too small
+    __slots__ = ("low", "high")
+
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    #an empty interval means the expression has no real value anywhere in the inputs (like sqrt([-2,-1]))
+    is_empty = lambda self: self.low > self.high
+    contains = lambda self, number: self.low <= number <= self.high
+    contains_zero = lambda self: self.low <= 0 <= self.high
+
+    def __repr__(self):
+        return f"Interval({self.low}, {self.high})"
+
+    def __add__(self, other):
+        other = to_interval(other)
+        return create_interval([self.low + other.low, self.high + other.high], self, other)
+    
+    def __radd__(self, other):
+        return self + other
+    
+    def __sub__(self, other):
+        other = to_interval(other)
+        return create_interval([self.low - other.high, self.high - other.low], self, other)
+    
+    def __rsub__(self, other):
+        return to_interval(other) - self
+    
+    def __mul__(self, other):
+        other = to_interval(other)
+        products = [self.low * other.low, self.low * other.high, self.high * other.low, self.high * other.high]
+
+        return create_interval(products, self, other)
+    
+    def __rmul__(self, other):
+        return self * other
+    
+    def __truediv__(self, other):
+        other = to_interval(other)
+
+        if other.low == 0 and other.high == 0:
+            return EMPTY_INTERVAL  #always dividing by 0
+        elif other.contains_zero():
+            return create_interval([-math.inf, math.inf], self, other)  #the result can be any size
         
-        return should_add_char
+        return self * create_interval([1 / other.low, 1 / other.high], other)
     
-    def apply_operator(self, operand1, operand2):
-        if not self.is_operator():
-            return
+    def __rtruediv__(self, other):
+        return to_interval(other) / self
+    
+    def __pow__(self, other):
+        other = to_interval(other)
+
+        if self.is_empty() or other.is_empty():
+            return EMPTY_INTERVAL
+
+        if other.low == other.high and other.low == int(other.low):
+            return self.integer_power(int(other.low))
+        
+        if self.low < 0 and math.floor(other.high) >= other.low:
+            #a negative base to one of the integer powers in the interval could be any sign
+            return Interval(-math.inf, math.inf)
+        
+        #a negative number to a non-integer power is not a real number, so only the
+        #non-negative part of the base is used. For a positive base, a^b is monotonic in
+        #both a and b, so the highest and lowest values are found at the corners
+        if self.high < 0:
+            return EMPTY_INTERVAL
+        
+        base_low = max(self.low, 0.0)
+        corners = [safe_power(base, exponent) for base in (base_low, self.high) for exponent in (other.low, other.high)]
+
+        return create_interval(corners)
+    
+    def __rpow__(self, other):
+        return to_interval(other) ** self
+    
+    def integer_power(self, exponent):
+        if exponent < 0:
+            return 1 / self.integer_power(-exponent)
+        
+        low_power = safe_power(self.low, exponent)
+        high_power = safe_power(self.high, exponent)
+
+        if exponent % 2 == 0 and self.contains_zero():
+            #even powers have their minimum at 0
+            return create_interval([0.0, max(low_power, high_power)])
+        
+        return create_interval([low_power, high_power])
+    
+    def contains_point_of(self, start, period):
+        #whether the interval contains any of the points start + k*period (for an integer k)
+        k = math.ceil((self.low - start) / period)
+
+        return start + k * period <= self.high
+    
+
+EMPTY_INTERVAL = Interval(math.inf, -math.inf)
+
+
+def to_interval(number):
+    if isinstance(number, Interval):
+        return number
+    
+    return Interval(number, number)
+
+
+def create_interval(values, *operands):
+    #return the smallest interval containing all of the values, rounded outwards
+    if any(operand.is_empty() for operand in operands):
+        return EMPTY_INTERVAL
+    
+    if any(math.isnan(value) for value in values):
+        #this comes from things like inf-inf or 0*inf, so the result could be anything
+        return Interval(-math.inf, math.inf)
+    
+    return Interval(math.nextafter(min(values), -math.inf), math.nextafter(max(values), math.inf))
+
+
+def safe_power(base, exponent):
+    #a power that gives infinity rather than an error if it overflows or is 0 to a negative power
+    try:
+        return float(base ** exponent)
+    except (OverflowError, ZeroDivisionError):
+        return math.inf
+    
+
+def interval_sin(argument):
+    if not isinstance(argument, Interval):
+        return math.sin(argument)
+    
+    if argument.is_empty():
+        return EMPTY_INTERVAL
+    
+    if argument.high - argument.low >= 2 * math.pi:
+        return Interval(-1.0, 1.0)  #a whole period is included
+    
+    values = [math.sin(argument.low), math.sin(argument.high)]
+
+    #sin is only highest at π/2 + 2kπ and lowest at 3π/2 + 2kπ
+    if argument.contains_point_of(math.pi / 2, 2 * math.pi):
+        values.append(1.0)
+    if argument.contains_point_of(3 * math.pi / 2, 2 * math.pi):
+        values.append(-1.0)
+
+    return create_interval(values)
+
+
+def interval_cos(argument):
+    #cos(x) = sin(x + π/2)
+    if not isinstance(argument, Interval):
+        return math.cos(argument)
+
+    return interval_sin(argument + math.pi / 2)
+
+
+def interval_tan(argument):
+    if not isinstance(argument, Interval):
+        return math.tan(argument)
+    
+    if argument.is_empty():
+        return EMPTY_INTERVAL
+    
+    #tan is increasing between each of its asymptotes at π/2 + kπ
+    if argument.high - argument.low >= math.pi or argument.contains_point_of(math.pi / 2, math.pi):
+        return Interval(-math.inf, math.inf)
+    
+    return create_interval([math.tan(argument.low), math.tan(argument.high)])
+
+
+def interval_sqrt(argument):
+    if not isinstance(argument, Interval):
+        return math.sqrt(argument)
+    
+    if argument.is_empty() or argument.high < 0:
+        return EMPTY_INTERVAL
+    
+    return create_interval([math.sqrt(max(argument.low, 0.0)), math.sqrt(argument.high)])
+
+
+def interval_ln(argument):
+    if not isinstance(argument, Interval):
+        return math.log(argument)
+    
+    if argument.is_empty() or argument.high <= 0:
+        return EMPTY_INTERVAL
+    
+    low = math.log(argument.low) if argument.low > 0 else -math.inf
+
+    return create_interval([low, math.log(argument.high)])
+
+
+FUNCTION_OPERATIONS = (math.sin, math.cos, math.tan, math.sqrt, math.log)
+
+INTERVAL_FUNCTION_OPERATIONS = (interval_sin, interval_cos, interval_tan, interval_sqrt, interval_ln)
+
+INTERVAL_FUNCTIONS = {
+    "sin" : interval_sin,
+    "cos" : interval_cos,
+    "tan" : interval_tan,
+    "sqrt" : interval_sqrt,
+    "ln" : interval_ln
+}
+
+DUAL_FUNCTION_OPERATIONS = (
+    create_dual_function(math.sin, math.cos),
+    create_dual_function(math.cos, lambda value: -math.sin(value)),
+    create_dual_function(math.tan, lambda value: 1 / math.cos(value) ** 2),
+    create_dual_function(math.sqrt, lambda value: 1 / (2 * math.sqrt(value))),
+    create_dual_function(math.log, lambda value: 1 / value)
+)
+
+
+class CompactExpression:
+    #the postfix expression stored as an array of opcodes (one byte per token) and a
+    #pool of the numbers in the expression (already converted to floats)
+    NUMBER_OPCODE = 0
+    INVALID_NUMBER_OPCODE = 1
+    UNKNOWN_FUNCTION_OPCODE = 2
+
+    #the order of these must match BINARY_OPERATIONS and the FUNCTION_OPERATIONS tuples
+    OPERATOR_OPCODES = {"+" : 3, "-" : 4, "*" : 5, "/" : 6, "^" : 7}
+    FUNCTION_OPCODES = {"sin" : 8, "cos" : 9, "tan" : 10, "sqrt" : 11, "ln" : 12}
+
+    FIRST_OPERATOR_OPCODE = 3
+    FIRST_FUNCTION_OPCODE = 8
+    FIRST_ALGEBRA_TERM_OPCODE = 13  #x is 13, y is 14, z is 15
+
+    BINARY_OPERATIONS = (operator.add, operator.sub, operator.mul, operator.truediv, operator.pow)
+
+    #the strings of the operators and functions, indexed by opcode - FIRST_OPERATOR_OPCODE
+    #and opcode - FIRST_FUNCTION_OPCODE, so the expression graph can be built from the opcodes
+    OPERATOR_STRINGS = tuple(OPERATOR_OPCODES.keys())
+    FUNCTION_STRINGS = tuple(FUNCTION_OPCODES.keys())
+
+    __slots__ = ("opcodes", "constants", "unknown_functions", "invalid_numbers")
+
+    def __init__(self, postfix_expression):
+        self.opcodes = array.array("b")
+        self.constants = array.array("d")
+        self.unknown_functions = []
+        self.invalid_numbers = []
+
+        for token in postfix_expression:
+            self.add_token(token)
+
+    def add_token(self, token):
+        if token.is_number() or token.is_constant():
+            if token.get_number() is None:
+                #an invalid number (like 1.2.3) gives an error when it is evaluated
+                self.opcodes.append(CompactExpression.INVALID_NUMBER_OPCODE)
+                self.invalid_numbers.append(token.string)
+            else:
+                self.opcodes.append(CompactExpression.NUMBER_OPCODE)
+                self.constants.append(token.get_number())
+        elif token.is_algebra_term():
+            term_index = Token.ALGEBRA_TERMS.index(token.get_algebra_term_name())
+            self.opcodes.append(CompactExpression.FIRST_ALGEBRA_TERM_OPCODE + term_index)
+        elif token.is_operator():
+            self.opcodes.append(CompactExpression.OPERATOR_OPCODES[token.string])
+        elif token.is_function():
+            if token.string in CompactExpression.FUNCTION_OPCODES.keys():
+                self.opcodes.append(CompactExpression.FUNCTION_OPCODES[token.string])
+            else:
+                self.opcodes.append(CompactExpression.UNKNOWN_FUNCTION_OPCODE)
+                self.unknown_functions.append(token.string)
+
+    def evaluate(self, variable_substitutions, function_operations=FUNCTION_OPERATIONS):
+        #the opcodes are interpreted with a plain list as the stack and tuples of operations
+        #(indexed by opcode) so no methods are called on tokens for each step. Different
+        #function operations can be given to evaluate with other types of number
+        term_values = [variable_substitutions.get(term) for term in Token.ALGEBRA_TERMS]
+
+        binary_operations = CompactExpression.BINARY_OPERATIONS
+
+        first_operator = CompactExpression.FIRST_OPERATOR_OPCODE
+        first_function = CompactExpression.FIRST_FUNCTION_OPCODE
+        first_algebra_term = CompactExpression.FIRST_ALGEBRA_TERM_OPCODE
+
+        constant_index = 0
+        stack = []
+
+        for opcode in self.opcodes:
+            if opcode == CompactExpression.NUMBER_OPCODE:
+                stack.append(self.constants[constant_index])
+                constant_index += 1
+            elif opcode >= first_algebra_term:
+                stack.append(term_values[opcode - first_algebra_term])
+            elif opcode >= first_function:
+                #popping from an empty stack gives None, like Stack.pop()
+                argument = stack.pop() if stack else None
+                stack.append(function_operations[opcode - first_function](argument))
+            elif opcode >= first_operator:
+                operand2 = stack.pop() if stack else None
+                operand1 = stack.pop() if stack else None
+
+                stack.append(binary_operations[opcode - first_operator](operand1, operand2))
+            elif opcode == CompactExpression.INVALID_NUMBER_OPCODE:
+                #this is the first invalid number reached, so it is first in the list
+                raise ValueError(get_invalid_number_message(self.invalid_numbers[0]))
+            else:
+                #this is the first unknown function reached, so it is first in the list
+                raise KeyError(self.unknown_functions[0])
+
+        #evaluation will be only item left in the stack
+        return stack.pop() if stack else None
+    
+
+class ExpressionNode:
+    NUMBER_KIND = 0
+    ALGEBRA_TERM_KIND = 1
+    OPERATOR_KIND = 2
+    FUNCTION_KIND = 3
+    NONE_KIND = 4  #an operand missing from the expression
+    INVALID_NUMBER_KIND = 5  #a number that can't be converted to a float (like 1.2.3)
+
+    __slots__ = ("kind", "string", "value", "children", "index")
+
+    def __init__(self, kind, string, value, children, index):
+        self.kind = kind
+        self.string = string
+        self.value = value
+        self.children = children
+
+        #nodes are numbered in the order they are created, so every
+        #node has a higher index than all of the nodes it depends on
+        self.index = index
+
+    is_number = lambda self: self.kind == ExpressionNode.NUMBER_KIND
+    is_algebra_term = lambda self: self.kind == ExpressionNode.ALGEBRA_TERM_KIND
+    is_operator = lambda self: self.kind == ExpressionNode.OPERATOR_KIND
+    is_function = lambda self: self.kind == ExpressionNode.FUNCTION_KIND
+    is_invalid_number = lambda self: self.kind == ExpressionNode.INVALID_NUMBER_KIND
+    is_leaf = lambda self: len(self.children) == 0
+
+    def get_leaf_source(self):
+        #return the python source code used for a leaf node
+        if self.is_number():
+            return number_to_source(self.value)
+        elif self.is_algebra_term():
+            return self.string
+        else:
+            return "None"
         
-        match self.string:
+
+class ExpressionGraph:
+    #the expression as a directed acyclic graph. Identical subexpressions share the same node
+    #(common subexpression elimination) and any operations on numbers are worked out once
+    #when the graph is built (constant folding), so fewer operations are done per evaluation
+    def __init__(self, compact_expression):
+        self.nodes = []
+        self.node_lookup = {}
+
+        #every opcode would be a node if the expression was a tree
+        opcodes = compact_expression.opcodes
+        self.tree_node_count = len(opcodes)
+        self.tree_operation_count = len([opcode for opcode in opcodes 
+                                         if opcode == CompactExpression.UNKNOWN_FUNCTION_OPCODE or 
+                                         CompactExpression.FIRST_OPERATOR_OPCODE <= opcode < CompactExpression.FIRST_ALGEBRA_TERM_OPCODE])
+
+        self.root = self.build_graph(compact_expression)
+        self.reachable_nodes = self.find_reachable_nodes([self.root])
+
+        self.derivative_roots = {}  #the root of the derivative for each variable
+        self.polynomial_coefficients = {}  #the polynomial coefficients for each variable
+
+    get_root = lambda self: self.root
+    get_nodes = lambda self: self.reachable_nodes
+    get_node_count = lambda self: len(self.reachable_nodes)
+    get_tree_node_count = lambda self: self.tree_node_count
+    get_tree_operation_count = lambda self: self.tree_operation_count
+
+    def get_operation_count(self):
+        return len([node for node in self.reachable_nodes if not node.is_leaf()])
+    
+    def get_optimisation_report(self):
+        #the number of nodes and operations before and after optimisation
+        return {
+            "nodes_before" : self.get_tree_node_count(),
+            "nodes_after" : self.get_node_count(),
+            "operations_before" : self.get_tree_operation_count(),
+            "operations_after" : self.get_operation_count()
+        }
+
+    def get_node(self, kind, string, value, children):
+        #return the node with these properties, only creating it if an identical node does not already
+        #exist. Numbers are looked up by their hex string so 0.0 and -0.0 are different nodes
+        value_key = value.hex() if kind == ExpressionNode.NUMBER_KIND else None
+        key = (kind, string, value_key, tuple(child.index for child in children))
+
+        if key not in self.node_lookup:
+            node = ExpressionNode(kind, string, value, children, len(self.nodes))
+
+            self.nodes.append(node)
+            self.node_lookup[key] = node
+
+        return self.node_lookup[key]
+    
+    def get_number_node(self, value):
+        if value is None:
+            return self.get_node(ExpressionNode.NONE_KIND, None, None, ())
+
+        return self.get_node(ExpressionNode.NUMBER_KIND, None, value, ())
+    
+    def get_operation_node(self, kind, string, children):
+        folded_value = self.fold_constants(kind, string, children)
+
+        if folded_value is not None:
+            return self.get_number_node(folded_value)
+
+        if string == "+" or string == "*":
+            #addition and multiplication are commutative, so x*2 and 2*x can share a node
+            children = sorted(children, key=lambda child: child.index)
+
+        return self.get_node(kind, string, None, tuple(children))
+    
+    def fold_constants(self, kind, string, children):
+        #return the value of an operation if all of its operands are numbers. None is
+        #returned if the operation cannot be folded, including when it would give an error
+        #(like 1/0), so the error is still given when the expression is evaluated
+        if not all(child.is_number() for child in children):
+            return None
+        
+        operands = [child.value for child in children]
+        
+        try:
+            if kind == ExpressionNode.OPERATOR_KIND:
+                result = OPERATOR_FUNCTIONS[string](*operands)
+            else:
+                result = Token.FUNCTIONS[string](*operands)
+        except (ArithmeticError, ValueError, KeyError):
+            return None
+        
+        if not isinstance(result, float):
+            return None  #a negative number to a fractional power gives a complex number
+        
+        return result
+    
+    def build_graph(self, compact_expression):
+        #the opcodes are in postfix order, so the graph is built the same way CompactExpression.evaluate() 
+        #works, but pushing nodes onto the stack instead of values
+        node_stack = Stack()
+        pop_operand = lambda: node_stack.pop() or self.get_number_node(None)
+
+        constants = iter(compact_expression.constants)
+        unknown_functions = iter(compact_expression.unknown_functions)
+        invalid_numbers = iter(compact_expression.invalid_numbers)
+
+        for opcode in compact_expression.opcodes:
+            if opcode == CompactExpression.NUMBER_OPCODE:
+                node_stack.push(self.get_number_node(next(constants)))
+            elif opcode == CompactExpression.INVALID_NUMBER_OPCODE:
+                node_stack.push(self.get_node(ExpressionNode.INVALID_NUMBER_KIND, next(invalid_numbers), None, ()))
+            elif opcode >= CompactExpression.FIRST_ALGEBRA_TERM_OPCODE:
+                term_name = Token.ALGEBRA_TERMS[opcode - CompactExpression.FIRST_ALGEBRA_TERM_OPCODE]
+                node_stack.push(self.get_node(ExpressionNode.ALGEBRA_TERM_KIND, term_name, None, ()))
+            elif opcode >= CompactExpression.FIRST_OPERATOR_OPCODE and opcode < CompactExpression.FIRST_FUNCTION_OPCODE:
+                operand2 = pop_operand()
+                operand1 = pop_operand()
+
+                operator_string = CompactExpression.OPERATOR_STRINGS[opcode - CompactExpression.FIRST_OPERATOR_OPCODE]
+                node_stack.push(self.get_operation_node(ExpressionNode.OPERATOR_KIND, 
+                                                        operator_string, 
+                                                        (operand1, operand2)))
+            else:
+                argument = pop_operand()
+
+                if opcode == CompactExpression.UNKNOWN_FUNCTION_OPCODE:
+                    function_string = next(unknown_functions)
+                else:
+                    function_string = CompactExpression.FUNCTION_STRINGS[opcode - CompactExpression.FIRST_FUNCTION_OPCODE]
+
+                node_stack.push(self.get_operation_node(ExpressionNode.FUNCTION_KIND, 
+                                                        function_string, 
+                                                        (argument,)))
+
+        #the root is None if the expression is empty
+        return node_stack.pop()
+    
+    def find_reachable_nodes(self, roots):
+        #return the nodes the roots depend on, in the order they must be evaluated
+        reachable_indexes = set()
+        node_stack = Stack()
+
+        for root in roots:
+            #a root is None if the expression is empty
+            if root is not None and root.index not in reachable_indexes:
+                reachable_indexes.add(root.index)
+                node_stack.push(root)
+
+        while not node_stack.is_empty():
+            node = node_stack.pop()
+
+            for child in node.children:
+                if child.index not in reachable_indexes:
+                    reachable_indexes.add(child.index)
+                    node_stack.push(child)
+
+        #a node always has a higher index than its children, so sorting by index gives a valid order
+        return [self.nodes[index] for index in sorted(reachable_indexes)]
+    
+    def differentiate(self, variable_name):
+        #return the root node of the derivative of the expression with respect to the variable.
+        #The derivative nodes are added to this graph, so they can share nodes with the expression
+        if variable_name in self.derivative_roots.keys():
+            return self.derivative_roots[variable_name]
+        
+        if self.root is None: return None
+
+        #the nodes are in evaluation order, so the derivatives 
+        #of a node's children are always found before it
+        derivatives = {}
+        for node in self.reachable_nodes:
+            derivatives[node.index] = self.differentiate_node(node, variable_name, derivatives)
+
+        derivative_root = derivatives[self.root.index]
+        self.derivative_roots[variable_name] = derivative_root
+
+        return derivative_root
+    
+    def differentiate_node(self, node, variable_name, derivatives):
+        if node.is_number():
+            return self.get_number_node(0.0)
+        elif node.is_algebra_term():
+            #any other algebra terms are treated as constants
+            return self.get_number_node(1.0 if node.string == variable_name else 0.0)
+        elif node.is_leaf():
+            return node  #an invalid number: the derivative gives the same error
+
+        child_derivatives = [derivatives[child.index] for child in node.children]
+
+        if node.is_operator():
+            return self.differentiate_operator(node, *node.children, *child_derivatives)
+        else:
+            return self.differentiate_function(node, *node.children, *child_derivatives)
+        
+    def differentiate_operator(self, node, a, b, da, db):
+        match node.string:
             case "+":
-                return operand1 + operand2
+                return self.add_nodes(da, db)
             case "-":
-                return operand1 - operand2
+                return self.subtract_nodes(da, db)
             case "*":
-                return operand1 * operand2
+                #product rule
+                return self.add_nodes(self.multiply_nodes(da, b), self.multiply_nodes(a, db))
             case "/":
-                return operand1 / operand2
+                #quotient rule, written as (da - (a/b)*db)/b so the a/b node is reused
+                return self.divide_nodes(self.subtract_nodes(da, self.multiply_nodes(node, db)), b)
             case "^":
-                return operand1 ** operand2
+                if self.is_number_node(db, 0):
+                    #the power is a constant: d(a^n) = n*a^(n-1)*da
+                    power = self.power_nodes(a, self.subtract_nodes(b, self.get_number_node(1.0)))
+                    return self.multiply_nodes(self.multiply_nodes(b, power), da)
+
+                #d(a^b) = a^b * (db*ln(a) + b*da/a)
+                ln_a = self.get_operation_node(ExpressionNode.FUNCTION_KIND, "ln", (a,))
+                bracket = self.add_nodes(self.multiply_nodes(db, ln_a), 
+                                         self.divide_nodes(self.multiply_nodes(b, da), a))
+
+                return self.multiply_nodes(node, bracket)
             
-    def apply_function(self, argument):        
-        func = Token.FUNCTIONS[self.string]
+    def differentiate_function(self, node, a, da):
+        get_function_node = lambda name: self.get_operation_node(ExpressionNode.FUNCTION_KIND, name, (a,))
+
+        match node.string:
+            case "sin":
+                return self.multiply_nodes(get_function_node("cos"), da)
+            case "cos":
+                negative_sin = self.multiply_nodes(self.get_number_node(-1.0), get_function_node("sin"))
+                return self.multiply_nodes(negative_sin, da)
+            case "tan":
+                cos_squared = self.power_nodes(get_function_node("cos"), self.get_number_node(2.0))
+                return self.divide_nodes(da, cos_squared)
+            case "sqrt":
+                #the sqrt(a) node is reused: d(sqrt(a)) = da/(2*sqrt(a))
+                return self.divide_nodes(da, self.multiply_nodes(self.get_number_node(2.0), node))
+            case "ln":
+                return self.divide_nodes(da, a)
+            case _:
+                return node  #an unknown function: the derivative gives the same error
+            
+    def get_polynomial_coefficients(self, variable_name):
+        #return the coefficients [a0, a1, a2...] if the expression is a polynomial a0 + a1*x + a2*x^2...
+        #in the variable, otherwise None. Any other algebra terms stop it being a polynomial
+        if variable_name not in self.polynomial_coefficients.keys():
+            self.polynomial_coefficients[variable_name] = self.find_polynomial_coefficients(variable_name)
+
+        return self.polynomial_coefficients[variable_name]
+    
+    def find_polynomial_coefficients(self, variable_name):
+        if self.root is None: return None
+
+        #every node the root depends on must also be a polynomial, and the nodes are
+        #in evaluation order, so the polynomials of a node's children are found before it
+        polynomials = {}
+        for node in self.reachable_nodes:
+            polynomial = self.get_node_polynomial(node, variable_name, polynomials)
+
+            if polynomial is None: return None
+            polynomials[node.index] = polynomial
+
+        coefficients = polynomials[self.root.index]
+
+        if not all(math.isfinite(coefficient) for coefficient in coefficients):
+            return None  #a coefficient overflowed
+        
+        return coefficients
+    
+    def get_node_polynomial(self, node, variable_name, polynomials):
+        if node.is_number():
+            return [node.value]
+        elif node.is_algebra_term():
+            return [0.0, 1.0] if node.string == variable_name else None
+        elif not node.is_operator():
+            return None  #an invalid number, or a function of the variable (constants are already folded)
+        
+        a, b = [polynomials[child.index] for child in node.children]
+
+        match node.string:
+            case "+":
+                return add_polynomials(a, b)
+            case "-":
+                return add_polynomials(a, [-coefficient for coefficient in b])
+            case "*":
+                return multiply_polynomials(a, b)
+            case "/":
+                #only dividing by a (non-zero) number gives a polynomial
+                if len(b) != 1 or b[0] == 0: return None
+
+                return [coefficient / b[0] for coefficient in a]
+            case "^":
+                #only whole number powers (which are numbers) give a polynomial
+                exponent = node.children[1]
+                if not exponent.is_number() or not float(exponent.value).is_integer(): return None
+                if not 0 <= exponent.value <= MAX_POLYNOMIAL_DEGREE: return None
+                if exponent.value * (len(a) - 1) > MAX_POLYNOMIAL_DEGREE: return None
+
+                result = [1.0]
+                for _ in range(int(exponent.value)):
+                    result = multiply_polynomials(result, a)
+
+                return result
+    
+    def is_number_node(self, node, number):
+        return node.is_number() and node.value == number
+    
+    #these build operation nodes, but skip operations which do nothing (like adding 0 or multiplying 
+    #by 1) so that the derivative does not do lots of unnecessary work when it is evaluated
+    def add_nodes(self, a, b):
+        if self.is_number_node(a, 0): return b
+        if self.is_number_node(b, 0): return a
+
+        return self.get_operation_node(ExpressionNode.OPERATOR_KIND, "+", (a, b))
+    
+    def subtract_nodes(self, a, b):
+        if self.is_number_node(b, 0): return a
 
-        return func(argument)
+        return self.get_operation_node(ExpressionNode.OPERATOR_KIND, "-", (a, b))
+    
+    def multiply_nodes(self, a, b):
+        if self.is_number_node(a, 0) or self.is_number_node(b, 0): return self.get_number_node(0.0)
+        if self.is_number_node(a, 1): return b
+        if self.is_number_node(b, 1): return a
+
+        return self.get_operation_node(ExpressionNode.OPERATOR_KIND, "*", (a, b))
+    
+    def divide_nodes(self, a, b):
+        if self.is_number_node(a, 0): return self.get_number_node(0.0)
+        if self.is_number_node(b, 1): return a
+
+        return self.get_operation_node(ExpressionNode.OPERATOR_KIND, "/", (a, b))
+    
+    def power_nodes(self, a, b):
+        if self.is_number_node(b, 1): return a
+
+        return self.get_operation_node(ExpressionNode.OPERATOR_KIND, "^", (a, b))
 
 
 class InfixExpression:
     def __init__(self, expression):
         self.expression = expression
-        self.postfix_expression = self.covert_to_postfix()
+        #only the compact form of the postfix expression is kept, because the tokens take much more memory
+        self.compact_expression = CompactExpression(self.covert_to_postfix())
+
+        #these are only compiled when they are first needed
+        self.expression_graph = None
+        self.compiled_functions = {}
+        self.compiled_array_functions = {}
+        self.compiled_interval_functions = {}
+
+    def __getstate__(self):
+        #compiled functions cannot be pickled, so they are left out when the
+        #expression is sent to another process (and recompiled there if needed)
+        state = self.__dict__.copy()
+        state["expression_graph"] = None
+        state["compiled_functions"] = {}
+        state["compiled_array_functions"] = {}
+        state["compiled_interval_functions"] = {}
+
+        return state
 
     def tokenise(self):
+        #split the expression into tokens in a single pass of TOKEN_REGEX. Unary minus
+        #and implied multiplication are dealt with as each token is found, so the
+        #time taken only grows linearly with the length of the expression
         tokens = []
-        current_token = Token()
+        prev_token = None
 
-        for char in self.expression:
-            if char == " ": continue
-                
-            char_added_to_token = current_token.add_char(char)
-                
-            if not char_added_to_token:
-                #the end of the current token has been reached - start adding a new token
-                tokens.append(current_token)
+        #spaces are ignored completely (so "si n" is still the sin function)
+        for match in TOKEN_REGEX.finditer(self.expression.replace(" ", "")):
+            token = Token()
+            token.set_token(match.group(), TOKEN_GROUP_TYPES[match.lastgroup])
 
-                current_token = Token()
-                current_token.add_char(char)
+            if self.is_unary_minus(prev_token, token):
+                #the number -12 is the same as (-1)*12, therefore multiplying by -1 
+                #will ensure it is evaluated correctly
+                minus_one = Token()
+                minus_one.set_number("-1")
 
-        tokens.append(current_token)  #add the final token
+                multiply = Token()
+                multiply.set_token("*", Token.OPERATOR_TYPE)
 
-        return tokens
-    
-    def detect_unary_minus(self, tokenised_expression):
-        #detect any unary minus operators and fix them
-        new_expression = []
-        for token_inx, token in enumerate(tokenised_expression):
-            if token.is_operator() and token.string == "-":
-                is_unary = True
-                if token_inx > 0:
-                    prev_token = tokenised_expression[token_inx - 1]
-                    is_unary = prev_token.is_operator() or prev_token.is_open_bracket()
-
-                if is_unary:
-                    #the number -12 is the same as (-1)*12, therefore multiplying by -1 
-                    #will ensure it is evaluated correctly
-                    minus_one = Token()
-                    minus_one.set_number("-1")
-
-                    multiply = Token()
-                    multiply.add_char("*")
-
-                    new_expression.append(minus_one)
-                    new_expression.append(multiply)
-
-                    #we do not want to append the minus token to the expression,
-                    #so just continue to the next token
-                    continue
-            
-            new_expression.append(token)
+                tokens.append(minus_one)
+                tokens.append(multiply)
 
-        return new_expression
-    
-    def detect_implied_multiplication(self, tokenised_expression):
-        #detect if the expression is (1+2)(3+4) instead of (1+2)*(3+4), or 2sin(5) instead of 2*sin(5)
-        for token_inx, token in enumerate(tokenised_expression):
-            if token_inx == 0: continue  #the first token can never be an implied multiplication
+                #we do not want to append the minus token to the expression
+                prev_token = multiply
+                continue
 
-            prev_token = tokenised_expression[token_inx - 1]
+            if self.is_implied_multiplication(prev_token, token):
+                #insert a multiplication token to make the multiplication explicit
+                multiply = Token()
+                multiply.set_token("*", Token.OPERATOR_TYPE)
 
-            prev_can_be_implied = (prev_token.is_number() or prev_token.is_close_bracket()
-                                   or prev_token.is_algebra_term() or prev_token.is_constant())
-            current_can_be_implied = (token.is_open_bracket() or token.is_function()
-                                     or token.is_algebra_term() or prev_token.is_constant())
+                tokens.append(multiply)
 
-            if prev_can_be_implied and current_can_be_implied:
-                #insert a multiplication token to make the multiplication explicit
-                mult_token = Token()
-                mult_token.add_char("*")
+            tokens.append(token)
+            prev_token = token
 
-                tokenised_expression.insert(token_inx, mult_token)
+        return tokens
+    
+    def is_unary_minus(self, prev_token, token):
+        #a minus is unary if it is at the start of the expression or after an operator or open bracket
+        if not token.is_operator() or token.string != "-":
+            return False
+        
+        if prev_token is None:
+            return True
 
-        return tokenised_expression
+        return prev_token.is_operator() or prev_token.is_open_bracket()
+    
+    def is_implied_multiplication(self, prev_token, token):
+        #detect if the expression is (1+2)(3+4) instead of (1+2)*(3+4), or 2sin(5) instead of 2*sin(5)
+        if prev_token is None:
+            return False  #the first token can never be an implied multiplication
+        
+        prev_can_be_implied = (prev_token.is_number() or prev_token.is_close_bracket()
+                               or prev_token.is_algebra_term() or prev_token.is_constant())
+        current_can_be_implied = (token.is_open_bracket() or token.is_function()
+                                  or token.is_algebra_term() or token.is_constant())
+        
+        #a number straight after a constant (like π2) is also multiplied by it
+        is_constant_then_number = prev_token.is_constant() and token.is_number()
+        
+        return (prev_can_be_implied and current_can_be_implied) or is_constant_then_number
 
     def covert_tokens_to_postfix(self, tokenised_expression):
         #use the Shunting Yard algorithm to return postfix expression of tokens
@@ -288,90 +1103,345 @@ class InfixExpression:
     
     def covert_to_postfix(self):
         tokenised_infix = self.tokenise()
-        
-        tokenised_infix = self.detect_unary_minus(tokenised_infix)
-        tokenised_infix = self.detect_implied_multiplication(tokenised_infix)
 
         tokenised_postfix = self.covert_tokens_to_postfix(tokenised_infix)
 
         return tokenised_postfix
     
-    def evaluate(self):
-        evaluate_stack = Stack()
-        for token in self.postfix_expression:
-            if token.is_number() or token.is_constant():
-                numerical_value = token.get_number()
-                evaluate_stack.push(numerical_value)
-            elif token.is_operator():
-                operand2 = evaluate_stack.pop()
-                operand1 = evaluate_stack.pop()
-            
-                result = token.apply_operator(operand1, operand2)
+    def evaluate(self, variable_substitutions=None):
+        #the values of any algebra terms are read from variable_substitutions, so the
+        #tokens are never changed and the expression can be shared between threads
+        if variable_substitutions is None:
+            variable_substitutions = {}
 
-                evaluate_stack.push(result)
-            elif token.is_function():
-                argument = evaluate_stack.pop()
+        return self.compact_expression.evaluate(variable_substitutions)
+    
+    def evaluate_interval(self, variable_intervals):
+        #return an interval containing every value the expression can take when each variable
+        #is anywhere in its (low, high) interval. Variables can also be given as single numbers
+        interval_substitutions = {}
+        for term_name, value in variable_intervals.items():
+            if isinstance(value, tuple):
+                value = Interval(*value)
 
-                result = token.apply_function(argument)
+            interval_substitutions[term_name] = value
 
-                evaluate_stack.push(result)
+        result = self.compact_expression.evaluate(interval_substitutions, INTERVAL_FUNCTION_OPERATIONS)
 
-        #evaluation will be only item left in the stack
-        final_result = evaluate_stack.pop()
+        if result is None: return None
+
+        return to_interval(result)
+    
+    def evaluate_dual(self, variable_name, variable_substitutions):
+        #evaluate the expression and its derivative with respect to the variable in one
+        #pass, using dual numbers. This gives exact derivatives without compiling anything
+        dual_substitutions = variable_substitutions.copy()
+        dual_substitutions[variable_name] = DualNumber(variable_substitutions[variable_name], 1.0)
+
+        result = self.compact_expression.evaluate(dual_substitutions, DUAL_FUNCTION_OPERATIONS)
+
+        if isinstance(result, DualNumber):
+            return result.value, result.derivative
+        
+        #the expression does not depend on the variable (or is empty)
+        return result, (None if result is None else 0.0)
+    
+    def get_expression_graph(self):
+        #the expression graph is only built when it is first needed
+        if self.expression_graph is None:
+            self.expression_graph = ExpressionGraph(self.compact_expression)
+
+        return self.expression_graph
+    
+    def get_polynomial_coefficients(self, variable_name):
+        #return the coefficients [a0, a1, a2...] if the expression is a 
+        #polynomial in the variable (a0 + a1*x + a2*x^2...), otherwise None
+        return self.get_expression_graph().get_polynomial_coefficients(variable_name)
+    
+    def generate_source(self, operator_source, derivative_variable=None):
+        #turn the optimised expression graph into the source code of a python function. Each
+        #operation is given its own line (t0, t1...) so very long expressions do not hit the
+        #python parser's limit on nested brackets, and shared subexpressions are only worked out once.
+        #If a derivative variable is given, the function returns the value and the derivative together
+        expression_graph = self.get_expression_graph()
+
+        roots = [expression_graph.get_root()]
+        if derivative_variable is not None:
+            roots.append(expression_graph.differentiate(derivative_variable))
+
+        node_sources = {}
+        lines = []
+
+        for node in expression_graph.find_reachable_nodes(roots):
+            if node.is_invalid_number():
+                #invalid numbers raise the same error as CompactExpression.evaluate()
+                lines.append(f"raise ValueError({get_invalid_number_message(node.string)!r})")
+
+            if node.is_leaf():
+                node_sources[node.index] = node.get_leaf_source()
+                continue
+
+            operands = [node_sources[child.index] for child in node.children]
+            result_name = f"t{len(lines)}"
+
+            if node.is_operator():
+                operation = operator_source[node.string].format(*operands)
+                lines.append(f"{result_name} = {operation}")
+            elif node.string in Token.FUNCTIONS.keys():
+                lines.append(f"{result_name} = _{node.string}({operands[0]})")
+            else:
+                #unknown functions raise the same error as CompactExpression.evaluate()
+                lines.append(f"raise KeyError({node.string!r})")
+
+            node_sources[node.index] = result_name
+
+        #a root is None if the expression is empty
+        root_sources = ["None" if root is None else node_sources[root.index] for root in roots]
+        lines.append(f"return {', '.join(root_sources)}")
+
+        arguments = ", ".join(f"{term}=None" for term in Token.ALGEBRA_TERMS)
+        body = "\n    ".join(lines)
+
+        return f"def compiled_expression({arguments}):\n    {body}"
+    
+    def compile(self, derivative_variable=None):
+        #return a python function which evaluates the expression, taking the values of the
+        #algebra terms as arguments. This is much faster than evaluate() when the same
+        #expression is evaluated many times (e.g. when drawing a graph). If a derivative
+        #variable is given, the function returns (value, derivative) in one evaluation
+        namespace = {f"_{name}" : func for name, func in Token.FUNCTIONS.items()}
+        exec(self.generate_source(SCALAR_OPERATOR_SOURCE, derivative_variable), namespace)
+
+        return namespace["compiled_expression"]
+    
+    def get_compiled_function(self, derivative_variable=None):
+        #compiled functions are stored so expressions from the cache are only compiled once
+        if derivative_variable not in self.compiled_functions.keys():
+            self.compiled_functions[derivative_variable] = self.compile(derivative_variable)
 
-        return final_result
+        return self.compiled_functions[derivative_variable]
+    
+    def compile_array(self, derivative_variable=None):
+        #the same as compile(), but the returned function takes numpy arrays
+        #and evaluates every element at once using numpy's ufuncs
+        namespace = {f"_{name}" : func for name, func in ARRAY_FUNCTIONS.items()}
+        namespace["_divide"] = divide_arrays
+        namespace["_power"] = power_arrays
+
+        exec(self.generate_source(ARRAY_OPERATOR_SOURCE, derivative_variable), namespace)
+
+        return namespace["compiled_expression"]
+    
+    def get_compiled_array_function(self, derivative_variable=None):
+        if derivative_variable not in self.compiled_array_functions.keys():
+            self.compiled_array_functions[derivative_variable] = self.compile_array(derivative_variable)
+
+        return self.compiled_array_functions[derivative_variable]
+    
+    def compile_interval(self, derivative_variable=None):
+        #the same as compile(), but the returned function takes Intervals (or numbers) and
+        #gives an Interval, like evaluate_interval(). This is much faster when the same
+        #expression is checked over lots of intervals (e.g. when searching for solutions)
+        namespace = {f"_{name}" : func for name, func in INTERVAL_FUNCTIONS.items()}
+        exec(self.generate_source(SCALAR_OPERATOR_SOURCE, derivative_variable), namespace)
+
+        return namespace["compiled_expression"]
+    
+    def get_compiled_interval_function(self, derivative_variable=None):
+        if derivative_variable not in self.compiled_interval_functions.keys():
+            self.compiled_interval_functions[derivative_variable] = self.compile_interval(derivative_variable)
+
+        return self.compiled_interval_functions[derivative_variable]
+    
+    def evaluate_array(self, x, **variable_values):
+        #evaluate the expression for every value in the array x. Any values that
+        #cause an error (like sqrt(-1) or 1/0) give NaN rather than raising
+        array_function = self.get_compiled_array_function()
+
+        x = numpy.asarray(x, dtype=float)
+
+        with numpy.errstate(all="ignore"):
+            result = array_function(x=x, **variable_values)
+
+        if result is None: return None
+
+        #expressions without an x in them (like y=3) give a single number
+        return numpy.broadcast_to(result, x.shape)
     
 
 class AlgebraicInfixExpression(InfixExpression):
     def __init__(self, expression):
         super().__init__(expression)
 
-        self.algebra_term_objects = self.replace_algebra_term_tokens()
+    def evaluate(self, variable_substitutions):
+        #polymorphism - unlike InfixExpression.evaluate(), the
+        #values of the algebra terms must always be given
+        return super().evaluate(variable_substitutions)
+
+
+if ARRAYS_SUPPORTED:
+    ARRAY_FUNCTIONS = {
+        "sin" : numpy.sin,
+        "cos" : numpy.cos,
+        "tan" : numpy.tan,
+        "sqrt" : numpy.sqrt,
+        "ln" : numpy.log
+    }
 
-    def replace_algebra_term_tokens(self):
-        #we want all of the 'x' term tokens to be the same object so it 
-        #is easier and faster to substitute them, same goes for 'y' etc.
-        seen_terms = {}
 
-        for inx, token in enumerate(self.postfix_expression):
-            if not token.is_algebra_term(): continue
+def divide_arrays(numerator, denominator):
+    #dividing by 0 would normally give infinity, but we want NaN to match
+    #the ZeroDivisionError given when a single number is divided by 0
+    result = numpy.true_divide(numerator, denominator)
 
-            term_name = token.get_algebra_term_name()
-            if term_name in seen_terms.keys():
-                #replace this token object with the object corresponding to the first occurance of the term
-                self.postfix_expression[inx] = seen_terms[term_name]
-            else:
-                #this token is the first occurance of this algebra term - record it in the dictionary
-                seen_terms[term_name] = token
+    return numpy.where(denominator == 0, numpy.nan, result)
 
-        return seen_terms
 
-    def substitute_variables(self, variable_substitutions):
-        #change all of the algebra terms to their numerical value
-        for term_name, value in variable_substitutions.items():
-            if term_name in self.algebra_term_objects.keys():
-                token_object = self.algebra_term_objects[term_name]
-                token_object.set_number(value)
+def power_arrays(base, exponent):
+    #powers that overflow (or are 0 to a negative power) give NaN
+    #to match the errors given when using single numbers
+    result = numpy.power(base, exponent)
+    overflowed = numpy.isinf(result) & numpy.isfinite(base) & numpy.isfinite(exponent)
 
-    def revert_substitution(self):
-        #reset the substituted algebra terms back to being algebra terms (not numbers)
-        for term_name, token_object in self.algebra_term_objects.items():
-            token_object.set_algebra_term(term_name)
+    return numpy.where(overflowed, numpy.nan, result)
 
-    def evaluate(self, variable_substitutions):
-        self.substitute_variables(variable_substitutions)
 
-        evaluation = super().evaluate()
+def add_polynomials(a, b):
+    #polynomials are lists of coefficients, starting with the constant term
+    if len(a) < len(b): a, b = b, a
+
+    result = a.copy()
+    for power, coefficient in enumerate(b):
+        result[power] += coefficient
+
+    return result
+
+
+def multiply_polynomials(a, b):
+    result = [0.0 for _ in range(len(a) + len(b) - 1)]
+
+    for a_power, a_coefficient in enumerate(a):
+        for b_power, b_coefficient in enumerate(b):
+            result[a_power + b_power] += a_coefficient * b_coefficient
+
+    return result
+
+
+def get_invalid_number_message(string):
+    #the same error message that float() gives for an invalid number (like 1.2.3)
+    return f"could not convert string to float: {string!r}"
+
+
+def number_to_source(number):
+    #return python source code for a number, making sure that negative numbers
+    #are bracketed (so -1^2 is not misread) and infinity is still valid code
+    if math.isinf(number) or math.isnan(number):
+        return f"float('{number}')"
+    elif number < 0:
+        return f"({number!r})"
+    else:
+        return repr(number)
+
+
+class LRUCache:
+    #a thread safe cache which removes the least recently used items when it gets too large.
+    #It can be limited by the number of items and by their total weight (see get_item_weight())
+    def __init__(self, max_size, max_weight=math.inf):
+        self.max_size = max_size
+        self.max_weight = max_weight
+
+        #the order of the dictionary is used to track which item was used least recently
+        self.items = collections.OrderedDict()
+        self.weight = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    get_hits = lambda self: self.hits
+    get_misses = lambda self: self.misses
+    get_size = lambda self: len(self.items)
+    get_weight = lambda self: self.weight
+
+    #every item has no weight unless a subclass overrides this, so only the number of items is limited
+    get_item_weight = lambda self, item: 0
+
+    def set_max_size(self, new_max_size):
+        with self.lock:
+            self.max_size = new_max_size
+            self.remove_least_recently_used()
+
+    def set_max_weight(self, new_max_weight):
+        with self.lock:
+            self.max_weight = new_max_weight
+            self.remove_least_recently_used()
+
+    def remove_least_recently_used(self):
+        #remove items until the cache is no longer too large
+        while len(self.items) > self.max_size or self.weight > self.max_weight:
+            _, removed_item = self.items.popitem(last=False)
+            self.weight -= self.get_item_weight(removed_item)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.weight = 0
+
+            self.hits = 0
+            self.misses = 0
+
+    def get(self, key):
+        #return the item stored for the key, or None if it is not in the cache
+        with self.lock:
+            if key not in self.items:
+                self.misses += 1
+                return None
+            
+            self.hits += 1
+            self.items.move_to_end(key)  #this is now the most recently used item
+
+            return self.items[key]
         
-        #ensure everything is back to normal if
-        #we want to substitute different numbers in
-        self.revert_substitution()
+    def add(self, key, item):
+        with self.lock:
+            if key in self.items:
+                self.weight -= self.get_item_weight(self.items[key])
+
+            self.items[key] = item
+            self.weight += self.get_item_weight(item)
+
+            self.remove_least_recently_used()
+
+
+class ExpressionCache(LRUCache):
+    def get_expression(self, expression):
+        #return the parsed expression for the expression string, only parsing it if it
+        #is not already in the cache. Spaces are ignored by the tokeniser, so they are
+        #removed from the key to make "x + 1" and "x+1" share the same expression
+        key = expression.replace(" ", "")
+
+        expression_object = self.get(key)
+        if expression_object is not None:
+            return expression_object
+
+        #parsed expressions are never modified when they are evaluated, so
+        #the same object can safely be given to every part of the program
+        expression_object = AlgebraicInfixExpression(key)
+        self.add(key, expression_object)
+
+        return expression_object
+    
+
+#a single cache is shared by every mode of the calculator
+EXPRESSION_CACHE = ExpressionCache(EXPRESSION_CACHE_SIZE)
+
 
-        return evaluation
+def get_expression(expression):
+    return EXPRESSION_CACHE.get_expression(expression)
 
 
 def evaluate_expression(expression):
-    expression_object = InfixExpression(expression)
-    result = expression_object.evaluate()
+    expression_object = get_expression(expression)
+    result = expression_object.evaluate({})
 
     return result
\ No newline at end of file
@@ -1,4 +1,5 @@
 import gui
+import time
 import pygame
 import equation_utils
 
@@ -152,6 +153,8 @@ class EquationMenu:
         most_recent_boxes = self.equation_boxes[-EquationMenu.NUM_EQUATION_BOXES:]
 
         for index, box in enumerate(most_recent_boxes):
+            box.update()
+
             top_left_y = (EquationMenu.BACKGROUND_BOX_TOP_LEFT[1] + 
                           EquationMenu.EQUATION_BOX_PADDING_Y + 
                           index * (height + EquationMenu.EQUATION_BOX_PADDING_Y))
@@ -177,27 +180,53 @@ class EquationMenu:
 class EquationBox:
     DECIMAL_PLACES = 4
 
+    #the range searched for solutions, unless the equation is a polynomial
     SOLUTION_MIN_X = -100
     SOLUTION_MAX_X = 100
 
     COLOUR = (110, 115, 123)
 
+    #equations are solved a bit at a time for this long each frame, so the GUI does not freeze
+    SOLVE_TIME_PER_FRAME = 0.01
+
     def __init__(self, window, equation_string):
         self.window = window
         self.equation_string = equation_string
 
+        self.solution_search = self.start_solving_equation()
         self.solution_string = self.get_solution_string()
 
+        #most equations are solved straight away, so they never need to show "solving..."
+        self.update()
+
     def solution_to_string(self, solution):
         correct_dp = round(solution, EquationBox.DECIMAL_PLACES)
         string = str(correct_dp)
 
         return string
 
+    def is_solving(self):
+        return self.solution_search is not None and not self.solution_search.is_finished()
+
     def get_solution_string(self):
-        solutions = self.solve_equation()
+        solutions = self.get_solutions()
+
+        if self.is_solving():
+            #show the solutions found so far while the rest are searched for
+            solutions_strings = [self.solution_to_string(solution) for solution in solutions]
+            return f"x={','.join(solutions_strings)}..." if len(solutions) > 0 else "solving..."
+
+        if self.solution_search is not None and self.solution_search.has_infinite_solutions():
+            #every value in part of the range is a solution (like x=x), so they can't be listed
+            if self.solution_search.is_always_solved():
+                return f"all x for {EquationBox.SOLUTION_MIN_X}<x<{EquationBox.SOLUTION_MAX_X}"
+            
+            return f"infinitely many for {EquationBox.SOLUTION_MIN_X}<x<{EquationBox.SOLUTION_MAX_X}"
 
         if len(solutions) == 0:
+            if self.is_polynomial():
+                return "none"  #every solution of a polynomial is searched for, not just the ones in the range
+            
             return f"none for {EquationBox.SOLUTION_MIN_X}<x<{EquationBox.SOLUTION_MAX_X}"
         
         solutions_strings = [self.solution_to_string(solution) for solution in solutions]
@@ -205,16 +234,42 @@ class EquationBox:
 
         return solution_text
 
-    def solve_equation(self):
+    def is_polynomial(self):
+        try:
+            return equation_utils.is_polynomial_equation(self.equation_string)
+        except:
+            return False  #the user has entered an invalid equation
+        
+    def start_solving_equation(self):
         try:
-            solutions = equation_utils.solve_equation(self.equation_string, 
-                                                      EquationBox.SOLUTION_MIN_X, 
-                                                      EquationBox.SOLUTION_MAX_X)
+            solution_search = equation_utils.start_solving_equation(self.equation_string, 
+                                                                    EquationBox.SOLUTION_MIN_X, 
+                                                                    EquationBox.SOLUTION_MAX_X)
         except:
             #the user has entered an invalid equation: no solutions will be displayed
-            solutions = []
+            solution_search = None
+
+        return solution_search
+    
+    def get_solutions(self):
+        if self.solution_search is None: return []
+
+        return self.solution_search.get_solutions()
+    
+    def update(self):
+        #carry on solving the equation for a short time, then show any new solutions
+        if not self.is_solving(): return
+
+        try:
+            new_solutions = self.solution_search.refine(time.perf_counter() + EquationBox.SOLVE_TIME_PER_FRAME)
+        except:
+            #the equation could not be evaluated: no solutions will be displayed
+            self.solution_search = None
+            new_solutions = []
 
-        return solutions
+        #the string only changes when there are new solutions or the search has finished
+        if len(new_solutions) > 0 or not self.is_solving():
+            self.solution_string = self.get_solution_string()
     
     def setup_background_rect(self, top_left_pos, width, height):
         #the background rect just looks like a button, 
@@ -1,22 +1,94 @@
+import math
+import time
+import atexit
+import bisect
 import calculator_utils
+import concurrent.futures
 
 
-class ArbitraryEquation:
-    SMALL_X_STEP = 0.01
+#the solution cache keeps at most this many solved equations (enough for every column of a few implicit
+#graphs), and this many solutions in total
+#(so a few equations with thousands of solutions, like sin(100x)=0, cannot use lots of memory)
+SOLUTION_CACHE_SIZE = 16384
+SOLUTION_CACHE_MAX_SOLUTIONS = 100000
+
+if calculator_utils.ARRAYS_SUPPORTED:
+    import numpy
+
 
+class ArbitraryEquation:
     FAST_NEWTON_RAPHSON_STEPS = 6
     ACCURATE_NEWTON_RAPHSON_STEPS = 20
 
     FAST_SEARCH_RESOLUTION = 12
     ACCURATE_SEARCH_RESOLUTION = 500
+
+    #the start points are checked in blocks, so whole blocks can be skipped at once
+    SEARCH_BLOCK_SIZE = 20
     
     TOLERANCE = 0.01
 
+    #Newton-Raphson stops early once its steps (relative to the solution) or the
+    #equation's value get this small, and gives up once it is this many range
+    #widths outside of the range being searched
+    STEP_TOLERANCE = 1e-12
+    RESIDUAL_TOLERANCE = 1e-15
+    DIVERGENCE_MARGIN = 1
+
+    #how solve() finished from a start point
+    CONVERGED = 0
+    DIVERGED = 1
+    MAX_ITERATIONS_REACHED = 2
+
+    #the number of grid samples used to look for sign changes when bracketing,
+    #and how many samples are skipped at once if they definitely have no solutions
+    BRACKET_SEARCH_RESOLUTION = 2000
+    BRACKET_BLOCK_SIZE = 50
+
+    BRENT_TOLERANCE = 1e-12
+    BRENT_MAX_ITERATIONS = 100
+
+    #the adaptive solver stops splitting the range once the parts are this fraction of it. Parts
+    #where the gradient could be infinite (or could not be found) stop being split much sooner,
+    #because interval arithmetic is unlikely to rule them out however small they get
+    ADAPTIVE_MIN_FRACTION = 2 ** -20
+    ADAPTIVE_UNBOUNDED_MIN_FRACTION = 2 ** -11
+
+    #the equation counts as exactly 0 (rather than close to a solution) when looking for parts
+    #of the range where every value is a solution, like all of x=x
+    CONSTANT_ZERO_TOLERANCE = 1e-9
+    #a root where the equation is very flat (like x^3=0) is within CONSTANT_ZERO_TOLERANCE of 0 for a little
+    #either side of it, so a part where every value is a solution must be at least this fraction of the range wide
+    ADAPTIVE_CONSTANT_ZERO_FRACTION = 2 ** -8
+
+    #the adaptive solver gives up after checking this many parts, so it always finishes in a reasonable
+    #time (even for equations with far too many solutions to find, like sin(x^3)=0)
+    ADAPTIVE_MAX_PARTS = 100000
+
+    #how find_all_solutions() searches for solutions
+    NEWTON_METHOD = 0
+    BRACKETING_METHOD = 1
+    VECTORISED_METHOD = 2
+    POLYNOMIAL_METHOD = 3
+    ADAPTIVE_METHOD = 4
+
+    #when solving with more than one worker process, the range is split into this many parts.
+    #This does not depend on the number of workers, so the same work is done however many there are
+    PARALLEL_CHUNKS = 16
+
     def __init__(self, lhs_expression, rhs_expression, variable_to_solve_for, fast_solve):
         self.lhs = lhs_expression
         self.rhs = rhs_expression
 
         self.variable_name = variable_to_solve_for
+        self.fast_solve = fast_solve
+
+        self.lhs_function = lhs_expression.get_compiled_function()
+        self.rhs_function = rhs_expression.get_compiled_function()
+
+        #these return the value and the exact (symbolic) derivative of each side together
+        self.lhs_gradient_function = lhs_expression.get_compiled_function(variable_to_solve_for)
+        self.rhs_gradient_function = rhs_expression.get_compiled_function(variable_to_solve_for)
 
         if fast_solve:
             self.resolution = ArbitraryEquation.FAST_SEARCH_RESOLUTION
@@ -25,18 +97,72 @@ class ArbitraryEquation:
             self.resolution = ArbitraryEquation.ACCURATE_SEARCH_RESOLUTION
             self.newton_raphson_steps = ArbitraryEquation.ACCURATE_NEWTON_RAPHSON_STEPS
 
+        self.bracket_resolution = ArbitraryEquation.BRACKET_SEARCH_RESOLUTION
+
+        #the fraction of the whole range being solved that this equation solves (less than 1 in the
+        #worker processes, which each solve a chunk), so the chunks together search as finely as one search
+        self.search_fraction = 1
+
         self.variable_substitutions = {}
 
+        #dual numbers find the same exact gradients as the compiled symbolic
+        #derivatives, but interpret the expressions instead of compiling them
+        self.use_dual_numbers = False
+
+        self.solve_method = ArbitraryEquation.NEWTON_METHOD
+
+        #with more than one worker, parts of the range are solved at the same time in other processes
+        self.workers = 1
+
+        #whether solutions are stored in (and looked up from) SOLUTION_CACHE
+        self.use_solution_cache = False
+
+        #the number of times the equation has been evaluated, the number of Newton-Raphson 
+        #iterations and how many times solve() finished with each status, by the last find_all_solutions()
+        self.evaluation_count = 0
+        self.iteration_count = 0
+        self.status_counts = [0, 0, 0]
+
+        #the total width of the parts of the range where every value is a solution (like all of 
+        #the range for x=x), found by the last adaptive search. These parts are not searched
+        self.constant_zero_width = 0
+
+    get_evaluation_count = lambda self: self.evaluation_count
+    get_iteration_count = lambda self: self.iteration_count
+    get_status_count = lambda self, status: self.status_counts[status]
+    get_constant_zero_width = lambda self: self.constant_zero_width
+
+    def set_solve_method(self, new_solve_method):
+        self.solve_method = new_solve_method
+
+    def set_workers(self, new_workers):
+        self.workers = new_workers
+
+    def set_search_fraction(self, new_search_fraction):
+        self.search_fraction = new_search_fraction
+
+        #the start points and samples are spread over the whole range, so each chunk only gets its share of them
+        self.resolution = math.ceil(self.resolution * new_search_fraction)
+        self.bracket_resolution = math.ceil(self.bracket_resolution * new_search_fraction)
+
+    def set_use_solution_cache(self, new_use_solution_cache):
+        self.use_solution_cache = new_use_solution_cache
+
+    def set_use_dual_numbers(self, new_use_dual_numbers):
+        self.use_dual_numbers = new_use_dual_numbers
+
     def set_variable_substitutions(self, new_variable_substitutions):
         self.variable_substitutions = new_variable_substitutions
     
     def evaluate_equals_zero(self, variable_value):
         #evaluate the equation as if it was in the form f(x)=0
+        self.evaluation_count += 1
+
         all_substitutions = self.variable_substitutions.copy()
         all_substitutions[self.variable_name] = variable_value
 
-        left = self.lhs.evaluate(all_substitutions)
-        right = self.rhs.evaluate(all_substitutions)
+        left = self.lhs_function(**all_substitutions)
+        right = self.rhs_function(**all_substitutions)
 
         #the equation is in form lhs=rhs, but we want it to be f(x)=0. 
         #Subtracting rhs gives lhs-rhs=0, which is in the right form
@@ -44,68 +170,1116 @@ class ArbitraryEquation:
 
         return evaluation
 
-    def differentiate(self, variable_value, y1_evaluation):
-        y2 = self.evaluate_equals_zero(variable_value + ArbitraryEquation.SMALL_X_STEP)
+    def evaluate_with_gradient(self, variable_value):
+        #evaluate f(x) and f'(x) together, where the equation is in the form f(x)=0
+        self.evaluation_count += 1
 
-        gradient = (y2 - y1_evaluation) / ArbitraryEquation.SMALL_X_STEP
+        all_substitutions = self.variable_substitutions.copy()
+        all_substitutions[self.variable_name] = variable_value
 
-        return gradient
+        if self.use_dual_numbers:
+            left, left_gradient = self.lhs.evaluate_dual(self.variable_name, all_substitutions)
+            right, right_gradient = self.rhs.evaluate_dual(self.variable_name, all_substitutions)
+        else:
+            left, left_gradient = self.lhs_gradient_function(**all_substitutions)
+            right, right_gradient = self.rhs_gradient_function(**all_substitutions)
+
+        return left - right, left_gradient - right_gradient
     
-    def solve(self, start_variable_value):
-        variable = start_variable_value
+    def evaluate_array_equals_zero(self, variable_values, with_gradient=False):
+        #the same as evaluate_equals_zero() (or evaluate_with_gradient()), but for a whole numpy
+        #array of values at once. Values that cause an error (like dividing by 0) give NaN
+        self.evaluation_count += len(variable_values)
+
+        all_substitutions = self.variable_substitutions.copy()
+        all_substitutions[self.variable_name] = variable_values
+
+        derivative_variable = self.variable_name if with_gradient else None
+        lhs_function = self.lhs.get_compiled_array_function(derivative_variable)
+        rhs_function = self.rhs.get_compiled_array_function(derivative_variable)
+
+        with numpy.errstate(all="ignore"):
+            if not with_gradient:
+                evaluation = lhs_function(**all_substitutions) - rhs_function(**all_substitutions)
+
+                #sides without the variable in them give a single number
+                return numpy.broadcast_to(evaluation, variable_values.shape)
+
+            left, left_gradient = lhs_function(**all_substitutions)
+            right, right_gradient = rhs_function(**all_substitutions)
+
+            evaluation = numpy.broadcast_to(left - right, variable_values.shape)
+            gradient = numpy.broadcast_to(left_gradient - right_gradient, variable_values.shape)
+
+        return evaluation, gradient
+    
+    def evaluate_interval_equals_zero(self, min, max, with_gradient=False):
+        #return an Interval containing every value of the equation (in the form f(x)=0) between
+        #min and max, and another containing every value of its gradient if with_gradient is True
+        self.evaluation_count += 1
+
+        all_intervals = self.variable_substitutions.copy()
+        all_intervals[self.variable_name] = calculator_utils.Interval(min, max)
+
+        derivative_variable = self.variable_name if with_gradient else None
+        lhs_function = self.lhs.get_compiled_interval_function(derivative_variable)
+        rhs_function = self.rhs.get_compiled_interval_function(derivative_variable)
+
+        if not with_gradient:
+            return calculator_utils.to_interval(lhs_function(**all_intervals) - rhs_function(**all_intervals))
+        
+        left, left_gradient = lhs_function(**all_intervals)
+        right, right_gradient = rhs_function(**all_intervals)
+
+        return calculator_utils.to_interval(left - right), calculator_utils.to_interval(left_gradient - right_gradient)
+    
+    def can_contain_solution(self, min, max):
+        #use interval arithmetic to check whether there could be a solution between min and max.
+        #If this returns False, there is definitely no solution in the range
+        try:
+            difference = self.evaluate_interval_equals_zero(min, max)
+        except (ArithmeticError, ValueError, TypeError, KeyError):
+            #the range could not be checked (e.g. the equation is invalid), so assume there could be a solution
+            return True
+        
+        return is_near_zero(difference)
+    
+    def solve(self, start_variable_value, min=-math.inf, max=math.inf):
+        #apply the Newton-Raphson method to solve the equation, for at most newton_raphson_steps
+        #iterations. Returns the solution found and the status (e.g. CONVERGED) it finished with
+        variable, status = self.newton_raphson(start_variable_value, min, max)
+        self.status_counts[status] += 1
+
+        return variable, status
+    
+    def newton_raphson(self, variable, min, max):
+        #solutions far outside of the range are not wanted, so
+        #stop as soon as Newton-Raphson moves too far away from it
+        margin = (max - min) * ArbitraryEquation.DIVERGENCE_MARGIN
+        lowest_variable, highest_variable = min - margin, max + margin
 
-        #apply the Newton-Raphson method to solve the equation
         for _ in range(self.newton_raphson_steps):
-            evaluation = self.evaluate_equals_zero(variable)
-            variable = variable - evaluation / self.differentiate(variable, evaluation)
+            self.iteration_count += 1
+
+            evaluation, gradient = self.evaluate_with_gradient(variable)
 
-        return variable
+            if isinstance(evaluation, complex) or not math.isfinite(evaluation):
+                return variable, ArbitraryEquation.DIVERGED
+            
+            if abs(evaluation) <= ArbitraryEquation.RESIDUAL_TOLERANCE:
+                return variable, ArbitraryEquation.CONVERGED
+            
+            step = evaluation / gradient
+            variable = variable - step
+
+            if isinstance(variable, complex) or not lowest_variable <= variable <= highest_variable:
+                return variable, ArbitraryEquation.DIVERGED  #this also catches NaN, as it fails all comparisons
+
+            if abs(step) <= ArbitraryEquation.STEP_TOLERANCE * (1 + abs(variable)):
+                return variable, ArbitraryEquation.CONVERGED
+
+        return variable, ArbitraryEquation.MAX_ITERATIONS_REACHED
     
     def check_solution(self, all_solutions, solution, min, max):
         #the Newton-Raphson method does not always converge,
         #so sometimes gives numbers that are not solutions
         solves_equation = abs(self.evaluate_equals_zero(solution)) < ArbitraryEquation.TOLERANCE
         in_range = min <= solution <= max
-        is_new = is_new_element(all_solutions, solution, ArbitraryEquation.TOLERANCE)
+        is_new = not all_solutions.contains(solution)
 
         return solves_equation and in_range and is_new
 
     def find_all_solutions(self, min, max, known_variable_substitutions):
         #find all the solutions to the equation in the range min <= solution <= max
         self.set_variable_substitutions(known_variable_substitutions)
+        self.evaluation_count = 0
+        self.iteration_count = 0
+        self.status_counts = [0, 0, 0]
+        self.constant_zero_width = 0
 
-        x_step = (max - min) / self.resolution
+        if not self.use_solution_cache:
+            return self.find_solutions(min, max)
+        
+        cache_key = self.get_cache_key(min, max)
 
-        solutions = []
-        for step in range(self.resolution):
-            start_x = min + step * x_step
-            solution = self.solve(start_x)
+        solutions = SOLUTION_CACHE.get_solutions(cache_key)
+        if solutions is None:
+            solutions = self.find_solutions(min, max)
 
-            if self.check_solution(solutions, solution, min, max):
-                solutions.append(solution)
+            #the cache only stores the solutions, so it can't say that every value in part of the range is a solution
+            if self.constant_zero_width == 0:
+                SOLUTION_CACHE.add_solutions(cache_key, solutions)
 
         return solutions
+    
+    def continue_solutions(self, previous_solutions, min, max, known_variable_substitutions):
+        #find the solutions again after the known variables have changed slightly (e.g. the next
+        #column of an implicit graph), using Newton-Raphson from each of the previous solutions
+        #instead of searching the whole range. New solutions far from the previous ones are not found
+        self.set_variable_substitutions(known_variable_substitutions)
+        self.evaluation_count = 0
+        self.iteration_count = 0
+        self.status_counts = [0, 0, 0]
+
+        solutions = RootSet(ArbitraryEquation.TOLERANCE)
+        for previous_solution in previous_solutions:
+            try:
+                solution, status = self.solve(previous_solution, min, max)
+            except (ArithmeticError, ValueError):
+                continue  #the solution has disappeared (e.g. the end of a circle has been reached)
+
+            if status != ArbitraryEquation.DIVERGED and self.check_solution(solutions, solution, min, max):
+                solutions.add(solution)
+
+        return solutions.get_roots()
+    
+    def get_cache_key(self, min, max):
+        #everything that changes which solutions are found. Spaces are removed
+        #from the expressions, so "x + 1=0" and "x+1=0" share the same solutions
+        return (self.lhs.expression.replace(" ", ""), 
+                self.rhs.expression.replace(" ", ""), 
+                self.variable_name, 
+                tuple(sorted(self.variable_substitutions.items())), 
+                min, 
+                max, 
+                self.fast_solve, 
+                self.solve_method)
+    
+    def find_solutions(self, min, max):
+        if self.workers > 1:
+            return self.find_solutions_parallel(min, max)
+
+        match self.solve_method:
+            case ArbitraryEquation.BRACKETING_METHOD:
+                return self.find_solutions_bracketing(min, max)
+            case ArbitraryEquation.VECTORISED_METHOD:
+                return self.find_solutions_vectorised(min, max)
+            case ArbitraryEquation.POLYNOMIAL_METHOD:
+                return self.find_solutions_polynomial(min, max)
+            case ArbitraryEquation.ADAPTIVE_METHOD:
+                return self.find_solutions_adaptive(min, max)
+            case _:
+                return self.find_solutions_newton(min, max)
+            
+    def find_solutions_parallel(self, min, max):
+        #split the range into chunks and solve them in the worker processes with the same solve method.
+        #The expressions are sent as strings and parsed again in each process, rather than sending
+        #the parsed expressions with their compiled functions (which cannot be sent to another process)
+        process_pool = get_process_pool(self.workers)
+        chunk_width = (max - min) / ArbitraryEquation.PARALLEL_CHUNKS
+
+        futures = []
+        for chunk in range(ArbitraryEquation.PARALLEL_CHUNKS):
+            chunk_min = min + chunk * chunk_width
+            chunk_max = max if chunk == ArbitraryEquation.PARALLEL_CHUNKS - 1 else chunk_min + chunk_width
+
+            futures.append(process_pool.submit(solve_chunk, 
+                                               self.lhs.expression, 
+                                               self.rhs.expression, 
+                                               self.variable_name, 
+                                               self.fast_solve, 
+                                               self.solve_method, 
+                                               chunk_min, 
+                                               chunk_max, 
+                                               self.variable_substitutions, 
+                                               1 / ArbitraryEquation.PARALLEL_CHUNKS))
+
+        #a solution on the boundary between two chunks can be found by both of them
+        solutions = RootSet(ArbitraryEquation.TOLERANCE)
+        for future in futures:
+            chunk_solutions, evaluation_count, constant_zero_width = future.result()
+
+            self.evaluation_count += evaluation_count
+            self.constant_zero_width += constant_zero_width
+            for solution in chunk_solutions:
+                solutions.add(solution)
+
+        return solutions.get_roots()
+    
+    def find_solutions_newton(self, min, max):
+        #apply Newton-Raphson from evenly spaced start points across the range
+        x_step = (max - min) / self.resolution
+
+        solutions = RootSet(ArbitraryEquation.TOLERANCE)
+        for block_start in range(0, self.resolution, ArbitraryEquation.SEARCH_BLOCK_SIZE):
+            block_end = block_start + ArbitraryEquation.SEARCH_BLOCK_SIZE
+            if block_end > self.resolution: block_end = self.resolution
+
+            #skip all of the start points in this block if it definitely has no solutions in it
+            if not self.can_contain_solution(min + block_start * x_step, min + block_end * x_step):
+                continue
+
+            for step in range(block_start, block_end):
+                start_x = min + step * x_step
+
+                try:
+                    solution, status = self.solve(start_x, min, max)
+                except (ArithmeticError, ValueError):
+                    #Newton-Raphson failed from this start point (e.g. it reached a stationary
+                    #point or left the domain of sqrt), but other start points may still work
+                    continue
+
+                if status == ArbitraryEquation.DIVERGED:
+                    continue  #no need to check a solution that is definitely not valid
+
+                if self.check_solution(solutions, solution, min, max):
+                    solutions.add(solution)
+
+        return solutions.get_roots()
+    
+    def find_solutions_vectorised(self, min, max):
+        #the same as find_solutions_newton(), but Newton-Raphson is applied from every start point
+        #at once using numpy arrays. Without numpy, the start points are solved one at a time instead
+        if not calculator_utils.ARRAYS_SUPPORTED:
+            return self.find_solutions_newton(min, max)
+        
+        x_step = (max - min) / self.resolution
+
+        #leave out the start points in blocks that definitely have no solutions in them
+        searched = numpy.zeros(self.resolution, dtype=bool)
+        for block_start in range(0, self.resolution, ArbitraryEquation.SEARCH_BLOCK_SIZE):
+            block_end = block_start + ArbitraryEquation.SEARCH_BLOCK_SIZE
+            if block_end > self.resolution: block_end = self.resolution
+
+            searched[block_start:block_end] = self.can_contain_solution(min + block_start * x_step, 
+                                                                        min + block_end * x_step)
+
+        variables = min + numpy.flatnonzero(searched) * x_step
+        candidates = variables[self.newton_raphson_arrays(variables, min, max) != ArbitraryEquation.DIVERGED]
+
+        #check all of the candidates at once, in the same way as check_solution()
+        evaluations = self.evaluate_array_equals_zero(candidates)
+        valid = (numpy.abs(evaluations) < ArbitraryEquation.TOLERANCE) & (min <= candidates) & (candidates <= max)
+
+        solutions = RootSet(ArbitraryEquation.TOLERANCE)
+        for solution in candidates[valid].tolist():
+            solutions.add(solution)
+
+        return solutions.get_roots()
+    
+    def newton_raphson_arrays(self, variables, min, max):
+        #apply Newton-Raphson to every element of the variables array in place (stopping in
+        #the same ways as newton_raphson()), and return the status each element finished with.
+        #Only the elements that are still active are evaluated in each iteration
+        margin = (max - min) * ArbitraryEquation.DIVERGENCE_MARGIN
+        lowest_variable, highest_variable = min - margin, max + margin
+
+        statuses = numpy.full(len(variables), ArbitraryEquation.MAX_ITERATIONS_REACHED)
+        active = numpy.ones(len(variables), dtype=bool)
+
+        for _ in range(self.newton_raphson_steps):
+            active_indices = numpy.flatnonzero(active)
+            if len(active_indices) == 0: break
+
+            self.iteration_count += len(active_indices)
+
+            active_variables = variables[active_indices]
+            evaluations, gradients = self.evaluate_array_equals_zero(active_variables, True)
+
+            with numpy.errstate(all="ignore"):
+                steps = evaluations / gradients
+
+            invalid_evaluation = ~numpy.isfinite(evaluations)
+            small_residual = ~invalid_evaluation & (numpy.abs(evaluations) <= ArbitraryEquation.RESIDUAL_TOLERANCE)
+            stepped = ~invalid_evaluation & ~small_residual
+
+            new_variables = numpy.where(stepped, active_variables - steps, active_variables)
+
+            #NaN fails all comparisons, so it also counts as leaving the range
+            left_range = stepped & ~((lowest_variable <= new_variables) & (new_variables <= highest_variable))
+            small_step = (stepped & ~left_range & 
+                          (numpy.abs(steps) <= ArbitraryEquation.STEP_TOLERANCE * (1 + numpy.abs(new_variables))))
+
+            diverged = invalid_evaluation | left_range
+            converged = small_residual | small_step
+
+            variables[active_indices] = new_variables
+            statuses[active_indices[diverged]] = ArbitraryEquation.DIVERGED
+            statuses[active_indices[converged]] = ArbitraryEquation.CONVERGED
+            active[active_indices[diverged | converged]] = False
+
+        for status in range(len(self.status_counts)):
+            self.status_counts[status] += int(numpy.count_nonzero(statuses == status))
+
+        return statuses
+    
+    def find_solutions_adaptive(self, min, max):
+        solutions = RootSet(ArbitraryEquation.TOLERANCE)
+
+        for solution in self.generate_solutions_adaptive(min, max):
+            if solution is not None:
+                solutions.add(solution)
+
+        return solutions.get_roots()
+    
+    def generate_solutions(self, min, max, known_variable_substitutions):
+        #a generator version of find_all_solutions(), which yields each solution as soon as it is
+        #found. None is also yielded after each small step of the search, so the caller can stop
+        #(and carry on later) without waiting for the next solution. See SolutionSearch
+        self.set_variable_substitutions(known_variable_substitutions)
+        self.evaluation_count = 0
+        self.iteration_count = 0
+        self.status_counts = [0, 0, 0]
+        self.constant_zero_width = 0
+
+        if self.solve_method == ArbitraryEquation.POLYNOMIAL_METHOD and self.get_polynomial_coefficients() is not None:
+            #all of a polynomial's solutions are found at once, which is already quick
+            yield from self.find_solutions_polynomial(min, max)
+        else:
+            #the other solve methods cannot be stopped part of the way through, so search adaptively
+            yield from self.generate_solutions_adaptive(min, max)
+    
+    def generate_solutions_adaptive(self, min, max):
+        #repeatedly split the range in half, using interval arithmetic to throw away the parts which
+        #definitely have no solutions. A part where the gradient cannot be 0 has at most one solution,
+        #so it is not split any further, and Brent's method is used if the equation changes sign in it.
+        #Yields each new solution when it is found, and None after each part is checked
+        self.constant_zero_width = 0
+
+        #the ends of the range may be ints, which can give int values (like 0 for x=x) that try_evaluate_equals_zero() rejects
+        min, max = float(min), float(max)
+
+        #the smallest parts are a fraction of the whole range being solved, not just of this chunk of it
+        min_width = (max - min) / self.search_fraction * ArbitraryEquation.ADAPTIVE_MIN_FRACTION
+        unbounded_min_width = (max - min) / self.search_fraction * ArbitraryEquation.ADAPTIVE_UNBOUNDED_MIN_FRACTION
+        constant_zero_min_width = (max - min) / self.search_fraction * ArbitraryEquation.ADAPTIVE_CONSTANT_ZERO_FRACTION
+
+        solutions = RootSet(ArbitraryEquation.TOLERANCE)
+
+        #the middle of a part is the end of the two parts it is split into,
+        #so the equation's value at each point is stored to only evaluate it once
+        point_values = {}
+
+        parts = calculator_utils.Stack()
+        parts.push((min, max))
+
+        #the parts are checked from left to right, so parts next to each other where the equation is 
+        #always 0 are joined into one run, which is only checked once it has ended. The run is stored 
+        #as its ends and the number of points in it where the equation is exactly 0
+        zero_run = None
+
+        for _ in range(ArbitraryEquation.ADAPTIVE_MAX_PARTS):
+            if parts.is_empty(): break
+
+            part_min, part_max = parts.pop()
+            new_solutions = []
+
+            if zero_run is not None and zero_run[1] != part_min:
+                new_solutions.append(self.end_zero_run(solutions, zero_run, constant_zero_min_width, min, max))
+                zero_run = None
+
+            try:
+                evaluation, gradient = self.evaluate_interval_equals_zero(part_min, part_max, True)
+            except (ArithmeticError, ValueError, TypeError, KeyError):
+                #the part could not be checked, so it can only be split up further
+                evaluation = gradient = calculator_utils.Interval(-math.inf, math.inf)
+
+            if (not is_near_zero(evaluation) or 
+                not self.lipschitz_can_contain_solution(point_values, part_min, part_max, gradient)):
+                pass  #there are definitely no solutions in this part
+            elif (not gradient.contains_zero() and not gradient.is_empty() and 
+                  self.can_evaluate_ends(point_values, part_min, part_max)):
+                new_solutions.append(self.find_monotonic_solution(solutions, point_values, 
+                                                                  part_min, part_max, min, max))
+            elif self.is_constant_zero(point_values, part_min, part_max, gradient):
+                #every value in this part may be a solution, so it is added to the run of parts like it (see 
+                #end_zero_run()). The start of the part is the end of the run it carries on, so it isn't counted twice
+                counted_points = [(part_min + part_max) / 2, part_max]
+                if zero_run is None: counted_points.append(part_min)
+
+                exact_zeros = len([x for x in counted_points if point_values[x] == 0])
+
+                if zero_run is None:
+                    zero_run = (part_min, part_max, exact_zeros)
+                else:
+                    zero_run = (zero_run[0], part_max, zero_run[2] + exact_zeros)
+            elif part_max - part_min <= (unbounded_min_width if is_unbounded(gradient) else min_width):
+                #the part is too small to split, but may still contain solutions where the
+                #equation touches 0 without changing sign (like x^2=0), so use Newton-Raphson
+                new_solutions.append(self.find_monotonic_solution(solutions, point_values, 
+                                                                  part_min, part_max, min, max))
+                new_solutions.append(self.try_add_solution(solutions, 
+                                                           lambda: self.solve((part_min + part_max) / 2, min, max)[0], 
+                                                           min, max))
+            else:
+                part_middle = (part_min + part_max) / 2
+
+                parts.push((part_middle, part_max))
+                parts.push((part_min, part_middle))
+
+            for solution in new_solutions:
+                if solution is not None: yield solution
+
+            yield None
+
+        if zero_run is not None:
+            solution = self.end_zero_run(solutions, zero_run, constant_zero_min_width, min, max)
+            if solution is not None: yield solution
+
+    def end_zero_run(self, solutions, zero_run, constant_zero_min_width, min, max):
+        #a wide run is part of the range where every value is a solution (like all of x=x). Rounding errors
+        #can leave some of its points slightly off 0, but at least two must be exactly 0, like in
+        #find_constant_zero_samples(), otherwise the equation is only getting very close to 0 (like
+        #(x-2)^3e^x=0 for very negative x). A narrow run is around a single solution where the equation
+        #is very flat (like x=0 for x^3=0 or sin(x)=x), so that solution is returned if it is added
+        run_min, run_max, exact_zeros = zero_run
+
+        if run_max - run_min >= constant_zero_min_width:
+            if exact_zeros >= 2: self.constant_zero_width += run_max - run_min
+            return None
+
+        return self.try_add_solution(solutions, lambda: self.polish_root((run_min + run_max) / 2, min, max), min, max)
+    
+    def can_evaluate_ends(self, point_values, part_min, part_max):
+        #a part with an end outside the equation's domain (like x<0 for x^0.5=2) can't be checked for a
+        #sign change, so it is split up further until the solution is in a part with both ends in the domain
+        return (self.try_evaluate_stored(point_values, part_min) is not None and 
+                self.try_evaluate_stored(point_values, part_max) is not None)
+    
+    def is_constant_zero(self, point_values, part_min, part_max, gradient):
+        #whether every value in the part may be a solution, like all of x=x or x>0 for sqrt(x^2)=x: the
+        #equation is 0 at both ends and the middle, and can't change by more than TOLERANCE in the part
+        if is_unbounded(gradient): return False
+
+        largest_gradient = max(abs(gradient.low), abs(gradient.high))
+        if largest_gradient * (part_max - part_min) / 2 > ArbitraryEquation.TOLERANCE: return False
+
+        #a solution where the equation only touches 0 (like x^2=0) is not 0 at all three points
+        for x in (part_min, (part_min + part_max) / 2, part_max):
+            y = self.try_evaluate_stored(point_values, x)
+            if y is None or abs(y) > ArbitraryEquation.CONSTANT_ZERO_TOLERANCE: return False
+
+        return True
+
+    def lipschitz_can_contain_solution(self, point_values, part_min, part_max, gradient):
+        #the equation can change by at most the largest gradient times the distance from the
+        #middle of the part, so it cannot reach 0 if its value in the middle is too far from 0.
+        #This is often much more accurate than the interval of the equation's values
+        if is_unbounded(gradient): return True
+
+        middle_y = self.try_evaluate_stored(point_values, (part_min + part_max) / 2)
+        if middle_y is None: return True
+
+        largest_gradient = max(abs(gradient.low), abs(gradient.high))
+
+        return abs(middle_y) <= largest_gradient * (part_max - part_min) / 2 + ArbitraryEquation.TOLERANCE
+    
+    def find_monotonic_solution(self, solutions, point_values, part_min, part_max, min, max):
+        #add the solution between part_min and part_max if the equation changes sign between them
+        part_min_y = self.try_evaluate_stored(point_values, part_min)
+        part_max_y = self.try_evaluate_stored(point_values, part_max)
+
+        if part_min_y is None or part_max_y is None: return None
+
+        if part_min_y == 0 or part_max_y == 0:
+            return self.try_add_solution(solutions, lambda: part_min if part_min_y == 0 else part_max, min, max)
+        elif part_min_y * part_max_y < 0:
+            return self.try_add_solution(solutions, 
+                                         lambda: self.brent(part_min, part_max, part_min_y, part_max_y), 
+                                         min, max)
+        
+        return None
+    
+    def get_polynomial_coefficients(self):
+        return get_polynomial_coefficients(self.lhs, self.rhs, self.variable_name)
+    
+    def find_solutions_polynomial(self, min, max):
+        #if the equation is a polynomial, all of its roots can be found directly instead of searching
+        #for them. Other equations (and ones like x=x where every value is a solution) are bracketed
+        coefficients = self.get_polynomial_coefficients()
+        if coefficients is None:
+            return self.find_solutions_bracketing(min, max)
+        
+        #a repeated root like in (x-3)^4=0 is found as several complex roots around it (spread out
+        #more the more times it is repeated), so no root can be ruled out by how far from real it is.
+        #The real part of every root is polished instead, and check_solution() rejects the non-roots
+        solutions = RootSet(ArbitraryEquation.TOLERANCE)
+        for root in find_polynomial_roots(get_square_free_part(coefficients)):
+            self.try_add_solution(solutions, lambda: self.polish_root(root.real, min, max), min, max)
+
+        return solutions.get_roots()
+    
+    def polish_root(self, root, min, max):
+        #make a root found approximately (like from the polynomial's coefficients) more accurate using Newton-Raphson
+        try:
+            solution, status = self.solve(root, min, max)
+        except ArithmeticError:
+            return root  #the gradient is 0 at the root (like x^2=0 at x=0), so it is already exact
+        
+        return root if status == ArbitraryEquation.DIVERGED else solution
+    
+    def find_solutions_bracketing(self, min, max):
+        #sample the equation once on a grid. Every sign change between two samples must contain
+        #a solution, which is found precisely with Brent's method. Solutions where the equation
+        #touches 0 without changing sign (like x^2=0) are found with Newton-Raphson instead
+        x_step = (max - min) / self.bracket_resolution
+
+        xs = [min + step * x_step for step in range(self.bracket_resolution + 1)]
+        ys = self.sample_equals_zero(xs)
+
+        constant_zero_samples = self.find_constant_zero_samples(xs, ys)
+
+        solutions = RootSet(ArbitraryEquation.TOLERANCE)
+        for inx in range(len(xs)):
+            if ys[inx] is None or constant_zero_samples[inx]: continue
+
+            if ys[inx] == 0:
+                self.try_add_solution(solutions, lambda: xs[inx], min, max)
+                continue
+
+            if inx + 1 < len(xs) and ys[inx + 1] is not None and ys[inx] * ys[inx + 1] < 0:
+                #there is a sign change between this sample and the next one
+                self.try_add_solution(solutions, 
+                                      lambda: self.brent(xs[inx], xs[inx + 1], ys[inx], ys[inx + 1]), 
+                                      min, max)
+            elif 0 < inx < len(xs) - 1 and self.is_turning_point_without_root(ys, inx):
+                self.try_add_solution(solutions, lambda: self.solve(xs[inx], min, max)[0], min, max)
+
+        return solutions.get_roots()
+    
+    def find_constant_zero_samples(self, xs, ys):
+        #samples next to each other that are all 0 are in a part of the range where every value is a
+        #solution (like all of x=x), so they are added to constant_zero_width instead of each being a
+        #separate solution. Rounding errors can leave some of them slightly off 0 (like sin(x)^2+cos(x)^2=1),
+        #but at least two must be exactly 0, so an equation that only gets very close to 0 (like x^10=0
+        #around x=0, or (x-2)^3e^x=0 for very negative x) still has its solutions found as normal
+        constant_zero_samples = [False for _ in xs]
 
+        run_start = None
+        exact_zeros = 0
+        for inx in range(len(xs) + 1):
+            if inx < len(xs) and ys[inx] is not None and abs(ys[inx]) <= ArbitraryEquation.CONSTANT_ZERO_TOLERANCE:
+                if run_start is None: run_start = inx
+                if ys[inx] == 0: exact_zeros += 1
+                continue
 
-def is_new_element(list, num, tolerance):
-    #determine if the num is in the list, within a 
-    #given tolerance (e.g. 5.001 should not be new to [3, 4, 5])
-    for element in list:
-        if abs(element - num) < tolerance:
-            return False  #already in list
+            if run_start is not None and exact_zeros >= 2:
+                self.constant_zero_width += xs[inx - 1] - xs[run_start]
 
-    return True
+                for run_inx in range(run_start, inx):
+                    constant_zero_samples[run_inx] = True
 
+            run_start = None
+            exact_zeros = 0
 
-def solve_equation(equation_string, min, max):
+        return constant_zero_samples
+    
+    def sample_equals_zero(self, xs):
+        #evaluate the equation at each x, leaving out blocks of samples that definitely have no
+        #solutions in them (their samples are left as None). Neighbouring blocks share the
+        #sample on their boundary, so no sign change between two blocks can be missed
+        ys = [None for _ in xs]
+
+        for block_start in range(0, len(xs) - 1, ArbitraryEquation.BRACKET_BLOCK_SIZE):
+            block_end = block_start + ArbitraryEquation.BRACKET_BLOCK_SIZE
+            if block_end > len(xs) - 1: block_end = len(xs) - 1
+
+            if not self.can_contain_solution(xs[block_start], xs[block_end]):
+                continue
+
+            for inx in range(block_start, block_end + 1):
+                if ys[inx] is None:
+                    ys[inx] = self.try_evaluate_equals_zero(xs[inx])
+
+        return ys
+    
+    def try_evaluate_equals_zero(self, variable_value):
+        #return None if the equation cannot be evaluated here (e.g. dividing by 0)
+        try:
+            evaluation = self.evaluate_equals_zero(variable_value)
+        except (ArithmeticError, ValueError):
+            return None
+        
+        if not isinstance(evaluation, float) or math.isnan(evaluation):
+            return None  #a complex number (or NaN) cannot change sign
+        
+        return evaluation
+    
+    def try_evaluate_stored(self, point_values, variable_value):
+        #the same as try_evaluate_equals_zero(), but values already in point_values are not evaluated again
+        if variable_value not in point_values.keys():
+            point_values[variable_value] = self.try_evaluate_equals_zero(variable_value)
+
+        return point_values[variable_value]
+    
+    def try_add_solution(self, solutions, find_solution, min, max):
+        #add the solution given by find_solution() to the solutions, unless finding it fails
+        #or it is not valid. Returns the solution if it was added, otherwise None
+        try:
+            solution = find_solution()
+        except (ArithmeticError, ValueError):
+            return None
+        
+        if not self.check_solution(solutions, solution, min, max):
+            return None
+        
+        solutions.add(solution)
+
+        return solution
+
+    def is_turning_point_without_root(self, ys, inx):
+        #whether |f(x)| is at its lowest at this sample, without f(x) changing sign either side
+        prev_y, y, next_y = ys[inx - 1], ys[inx], ys[inx + 1]
+
+        if prev_y is None or next_y is None: return False
+
+        same_sign = prev_y * y > 0 and y * next_y > 0
+        #one side is strict so flat regions (like 2^x-10 for very negative x) are not all turning points
+        lowest = abs(y) < abs(prev_y) and abs(y) <= abs(next_y)
+
+        return same_sign and lowest
+    
+    def brent(self, a, b, fa, fb):
+        #find the solution between a and b (where fa and fb have different signs) using Brent's
+        #method. This combines bisection, which always works, with the secant method and inverse
+        #quadratic interpolation, which converge much faster when the equation is well behaved
+        c, fc = b, fb
+        d = e = b - a
+
+        for _ in range(ArbitraryEquation.BRENT_MAX_ITERATIONS):
+            if (fb > 0 and fc > 0) or (fb < 0 and fc < 0):
+                #the solution is between a and b, so make c the other end of the bracket
+                c, fc = a, fa
+                d = e = b - a
+
+            if abs(fc) < abs(fb):
+                #b should always be the best estimate of the solution
+                a, b, c = b, c, b
+                fa, fb, fc = fb, fc, fb
+
+            tolerance = 2 * 2.2e-16 * abs(b) + 0.5 * ArbitraryEquation.BRENT_TOLERANCE
+            midpoint_step = 0.5 * (c - b)
+
+            if abs(midpoint_step) <= tolerance or fb == 0:
+                return b
+            
+            if abs(e) >= tolerance and abs(fa) > abs(fb):
+                #try interpolating to find the solution
+                s = fb / fa
+
+                if a == c:
+                    #secant method
+                    p = 2 * midpoint_step * s
+                    q = 1 - s
+                else:
+                    #inverse quadratic interpolation
+                    q = fa / fc
+                    r = fb / fc
+                    p = s * (2 * midpoint_step * q * (q - r) - (b - a) * (r - 1))
+                    q = (q - 1) * (r - 1) * (s - 1)
+
+                if p > 0: q = -q
+                p = abs(p)
+
+                if 2 * p < min(3 * midpoint_step * q - abs(tolerance * q), abs(e * q)):
+                    #the interpolation is inside the bracket and converging quickly enough
+                    e = d
+                    d = p / q
+                else:
+                    d = e = midpoint_step  #fall back to bisection
+            else:
+                d = e = midpoint_step  #fall back to bisection
+
+            a, fa = b, fb
+
+            if abs(d) > tolerance:
+                b += d
+            else:
+                b += math.copysign(tolerance, midpoint_step)
+
+            fb = self.evaluate_equals_zero(b)
+
+        return b
+
+
+def is_near_zero(interval):
+    #whether the interval could contain 0. Values within TOLERANCE of 0
+    #count, because check_solution() accepts them as solutions
+    return (interval.low <= ArbitraryEquation.TOLERANCE and 
+            interval.high >= -ArbitraryEquation.TOLERANCE)
+
+
+def is_unbounded(interval):
+    #whether the interval has no useful limits (it is infinite, or empty
+    #because the values could not be found, like sqrt([-2,-1]))
+    return interval.is_empty() or math.isinf(interval.low) or math.isinf(interval.high)
+
+
+class RootSet:
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+
+        #the roots are kept sorted, so checking whether a root is already
+        #in the set is a binary search rather than a search of every root
+        self.roots = []
+
+    get_roots = lambda self: self.roots.copy()
+
+    def __len__(self):
+        return len(self.roots)
+    
+    def __iter__(self):
+        return iter(self.roots)
+
+    def contains(self, root):
+        #determine if the root is in the set, within the tolerance
+        #(e.g. 5.001 is already in {3, 4, 5} if the tolerance is 0.01)
+        inx = bisect.bisect_right(self.roots, root - self.tolerance)
+
+        #this is the lowest root above root - tolerance, so it is the only one that needs checking
+        return inx < len(self.roots) and self.roots[inx] < root + self.tolerance
+    
+    def add(self, root):
+        #add the root if it is not already in the set, returning whether it was added
+        if self.contains(root): return False
+
+        bisect.insort(self.roots, root)
+
+        return True
+
+
+class SolutionCache(calculator_utils.LRUCache):
+    #the weight of each item is its number of solutions, so the total number of solutions is limited too
+    get_solution_count = lambda self: self.get_weight()
+
+    def get_item_weight(self, solutions):
+        #polymorphism - overrides the get_item_weight() method from LRUCache
+        return len(solutions)
+
+    def set_max_solutions(self, new_max_solutions):
+        self.set_max_weight(new_max_solutions)
+
+    def get_solutions(self, key):
+        #return a list of the solutions stored for the key, or None if they are not in the cache
+        solutions = self.get(key)
+        if solutions is None: return None
+
+        #a new list is returned so the stored solutions cannot be changed
+        return list(solutions)
+        
+    def add_solutions(self, key, solutions):
+        self.add(key, tuple(solutions))
+
+
+#a single cache is shared by Equation mode and the grapher
+SOLUTION_CACHE = SolutionCache(SOLUTION_CACHE_SIZE, SOLUTION_CACHE_MAX_SOLUTIONS)
+
+
+class SolutionSearch:
+    #an equation being solved a little at a time, so a solve can be spread across many frames
+    #of the GUI instead of freezing it. Each call to refine() carries on from the last one
+    def __init__(self, equation_solver, min, max, known_variable_substitutions):
+        self.equation_solver = equation_solver
+        self.min = min
+        self.max = max
+
+        self.solutions = RootSet(ArbitraryEquation.TOLERANCE)
+        self.finished = False
+
+        equation_solver.set_variable_substitutions(known_variable_substitutions)
+        self.cache_key = equation_solver.get_cache_key(min, max)
+
+        cached_solutions = SOLUTION_CACHE.get_solutions(self.cache_key) if equation_solver.use_solution_cache else None
+
+        if cached_solutions is not None:
+            for solution in cached_solutions:
+                self.solutions.add(solution)
+
+            self.finished = True
+        
+        self.search_steps = equation_solver.generate_solutions(min, max, known_variable_substitutions)
+
+    get_solutions = lambda self: self.solutions.get_roots()
+    is_finished = lambda self: self.finished
+
+    #whether every value in some (or all) of the range is a solution, like for sqrt(x^2)=x (or x=x)
+    has_infinite_solutions = lambda self: self.equation_solver.get_constant_zero_width() > 0
+    is_always_solved = lambda self: self.equation_solver.get_constant_zero_width() >= (self.max - self.min) * (1 - 1e-9)
+
+    def refine(self, deadline=None, evaluation_budget=None):
+        #carry on searching until the deadline (a time from time.perf_counter()) has passed, the equation
+        #has been evaluated evaluation_budget more times, or the search has finished. Returns the new solutions
+        start_evaluation_count = self.equation_solver.get_evaluation_count()
+        new_solutions = []
+
+        while not self.finished:
+            if deadline is not None and time.perf_counter() >= deadline: break
+
+            evaluations = self.equation_solver.get_evaluation_count() - start_evaluation_count
+            if evaluation_budget is not None and evaluations >= evaluation_budget: break
+
+            try:
+                solution = next(self.search_steps)
+            except StopIteration:
+                self.finish()
+                break
+
+            if solution is not None and self.solutions.add(solution):
+                new_solutions.append(solution)
+
+        return new_solutions
+    
+    def finish(self):
+        self.finished = True
+
+        #the cache only stores the solutions, so it can't say that every value in part of the range is a solution
+        if self.equation_solver.use_solution_cache and not self.has_infinite_solutions():
+            SOLUTION_CACHE.add_solutions(self.cache_key, self.solutions.get_roots())
+
+
+def solve_chunk(lhs_string, rhs_string, variable_name, fast_solve, solve_method, min, max, known_variable_substitutions, 
+                search_fraction):
+    #solve the equation between min and max (search_fraction of the whole range) in a worker process, returning the
+    #solutions, the number of evaluations it took to find them and the width where every value is a solution
+    equation_solver = ArbitraryEquation(calculator_utils.get_expression(lhs_string), 
+                                        calculator_utils.get_expression(rhs_string), 
+                                        variable_name, 
+                                        fast_solve)
+    equation_solver.set_solve_method(solve_method)
+    equation_solver.set_search_fraction(search_fraction)
+
+    solutions = equation_solver.find_all_solutions(min, max, known_variable_substitutions)
+
+    return solutions, equation_solver.get_evaluation_count(), equation_solver.get_constant_zero_width()
+
+
+#the worker processes are kept between solves, because starting them takes much longer than most solves
+process_pool = None
+process_pool_workers = 0
+
+
+def get_process_pool(workers):
+    global process_pool, process_pool_workers
+
+    if process_pool is None or process_pool_workers != workers:
+        shutdown_process_pool()
+
+        process_pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        process_pool_workers = workers
+
+    return process_pool
+
+
+@atexit.register
+def shutdown_process_pool():
+    global process_pool
+
+    if process_pool is not None:
+        process_pool.shutdown()
+        process_pool = None
+
+
+def get_polynomial_coefficients(lhs_expression, rhs_expression, variable_name):
+    #return the coefficients [a0, a1, a2...] of lhs-rhs (without any 0s for the highest powers)
+    #if the equation is a polynomial in the variable, otherwise None. None is also returned
+    #if lhs-rhs is 0, because every value is a solution and there are no roots to find
+    lhs_coefficients = lhs_expression.get_polynomial_coefficients(variable_name)
+    rhs_coefficients = rhs_expression.get_polynomial_coefficients(variable_name)
+
+    if lhs_coefficients is None or rhs_coefficients is None: return None
+
+    coefficients = calculator_utils.add_polynomials(lhs_coefficients, 
+                                                    [-coefficient for coefficient in rhs_coefficients])
+    
+    while len(coefficients) > 0 and coefficients[-1] == 0:
+        coefficients.pop()
+
+    if len(coefficients) == 0: return None
+
+    return coefficients
+
+
+def get_root_bound(coefficients):
+    #every root of the polynomial is less than this distance from 0 (Cauchy's bound)
+    highest_coefficient = coefficients[-1]
+
+    return 1 + max((abs(coefficient / highest_coefficient) for coefficient in coefficients[:-1]), default=0)
+
+
+def evaluate_polynomial(coefficients, x):
+    #Horner's method: a0 + x(a1 + x(a2 + ...))
+    result = 0
+    for coefficient in reversed(coefficients):
+        result = result * x + coefficient
+
+    return result
+
+
+#remainders smaller than this (relative to the largest coefficient) are treated as 0 when finding
+#the repeated factors of a polynomial, because the coefficients have rounding errors
+POLYNOMIAL_GCD_TOLERANCE = 1e-9
+
+
+def differentiate_polynomial(coefficients):
+    return [power * coefficient for power, coefficient in enumerate(coefficients)][1:]
+
+
+def trim_polynomial(coefficients, tolerance):
+    #remove the highest powers while their coefficients are within the tolerance of 0
+    coefficients = list(coefficients)
+    while len(coefficients) > 0 and abs(coefficients[-1]) <= tolerance:
+        coefficients.pop()
+
+    return coefficients
+
+
+def divide_polynomials(dividend, divisor):
+    #polynomial long division, returning the quotient and the remainder
+    remainder = list(dividend)
+    quotient = [0.0 for _ in range(max(len(dividend) - len(divisor) + 1, 1))]
+
+    for power in reversed(range(len(dividend) - len(divisor) + 1)):
+        multiplier = remainder[power + len(divisor) - 1] / divisor[-1]
+        quotient[power] = multiplier
+
+        for divisor_power, coefficient in enumerate(divisor):
+            remainder[power + divisor_power] -= multiplier * coefficient
+
+    return quotient, remainder[:len(divisor) - 1]
+
+
+def get_polynomial_gcd(a, b):
+    #Euclid's algorithm, with small remainders treated as 0
+    tolerance = POLYNOMIAL_GCD_TOLERANCE * max(map(abs, a + b))
+
+    while len(b) > 0:
+        _, remainder = divide_polynomials(a, b)
+        a, b = b, trim_polynomial(remainder, tolerance)
+
+    return a
+
+
+def get_square_free_part(coefficients):
+    #return the polynomial with each repeated root only once, like (x-3)^4 -> x-3. Repeated roots 
+    #are found much less accurately (the error grows like eps^(1/repeats)), but as single roots they are exact
+    if len(coefficients) <= 2: return coefficients
+
+    repeated_factors = get_polynomial_gcd(coefficients, differentiate_polynomial(coefficients))
+    if len(repeated_factors) <= 1: return coefficients
+
+    square_free_part, remainder = divide_polynomials(coefficients, repeated_factors)
+
+    #if the repeated factors don't divide the polynomial, rounding errors gave the wrong factors
+    tolerance = POLYNOMIAL_GCD_TOLERANCE * max(map(abs, coefficients))
+    if len(trim_polynomial(remainder, tolerance)) > 0: return coefficients
+
+    return square_free_part
+
+
+def find_polynomial_roots(coefficients):
+    #return all of the (complex) roots of the polynomial. The highest coefficient must not be 0
+    roots = []
+
+    #every 0 coefficient at the start is a root at 0
+    while len(coefficients) > 1 and coefficients[0] == 0:
+        roots.append(0j)
+        coefficients = coefficients[1:]
+
+    if len(coefficients) == 1: return roots  #a non-zero constant has no roots
+
+    if calculator_utils.ARRAYS_SUPPORTED:
+        roots.extend(find_companion_matrix_roots(coefficients))
+    else:
+        roots.extend(find_durand_kerner_roots(coefficients))
+
+    return roots
+
+
+def find_companion_matrix_roots(coefficients):
+    #the roots are the eigenvalues of the polynomial's companion matrix
+    degree = len(coefficients) - 1
+
+    companion_matrix = numpy.zeros((degree, degree))
+    companion_matrix[1:, :-1] = numpy.eye(degree - 1)
+    companion_matrix[:, -1] = -numpy.array(coefficients[:-1]) / coefficients[-1]
+
+    return [complex(root) for root in numpy.linalg.eigvals(companion_matrix)]
+
+
+DURAND_KERNER_MAX_ITERATIONS = 500
+DURAND_KERNER_TOLERANCE = 1e-14
+
+
+def find_durand_kerner_roots(coefficients):
+    #find every root at once without numpy. Each estimate is moved by Newton's method applied 
+    #to the polynomial divided by (x - every other estimate), so they all converge to different roots
+    monic_coefficients = [coefficient / coefficients[-1] for coefficient in coefficients]
+    degree = len(coefficients) - 1
+
+    #the estimates start spread around a circle containing all of the roots
+    radius = get_root_bound(monic_coefficients)
+    roots = [radius * complex(0.4, 0.9) ** power / abs(complex(0.4, 0.9)) ** power for power in range(degree)]
+
+    for _ in range(DURAND_KERNER_MAX_ITERATIONS):
+        largest_change = 0
+
+        for inx, root in enumerate(roots):
+            denominator = 1
+            for other_inx, other_root in enumerate(roots):
+                if other_inx != inx: denominator *= root - other_root
+
+            if denominator == 0: continue  #two estimates are the same, so move the other one first
+
+            change = evaluate_polynomial(monic_coefficients, root) / denominator
+            roots[inx] = root - change
+
+            largest_change = max(largest_change, abs(change) / (1 + abs(root)))
+
+        if largest_change <= DURAND_KERNER_TOLERANCE: break
+
+    return roots
+
+
+def is_polynomial_equation(equation_string):
+    #whether all of the equation's solutions can be found (so the range searched does not matter)
+    lhs, rhs = equation_string.split("=")
+
+    coefficients = get_polynomial_coefficients(calculator_utils.get_expression(lhs), 
+                                               calculator_utils.get_expression(rhs), 
+                                               "x")
+
+    return coefficients is not None
+
+
+def setup_equation_solver(equation_string, min, max):
+    #return the solver Equation mode uses for the equation string, and the range to solve it in
     lhs, rhs = equation_string.split("=")
 
-    lhs_expression = calculator_utils.AlgebraicInfixExpression(lhs)
-    rhs_expression = calculator_utils.AlgebraicInfixExpression(rhs)
+    lhs_expression = calculator_utils.get_expression(lhs)
+    rhs_expression = calculator_utils.get_expression(rhs)
 
     #solve the equation accurately, but more slowly (so set fast_solve to False)
     equation_solver = ArbitraryEquation(lhs_expression, rhs_expression, "x", False)
+    equation_solver.set_solve_method(ArbitraryEquation.POLYNOMIAL_METHOD)
+    equation_solver.set_use_solution_cache(True)
+
+    coefficients = equation_solver.get_polynomial_coefficients()
+    if coefficients is not None:
+        #all of a polynomial's roots are found, so it does not need to be limited to the range
+        root_bound = get_root_bound(coefficients)
+        min, max = -root_bound, root_bound
+
+    return equation_solver, min, max
+
+
+def solve_equation(equation_string, min, max, workers=1):
+    equation_solver, min, max = setup_equation_solver(equation_string, min, max)
+
+    if equation_solver.get_polynomial_coefficients() is None:
+        #a polynomial's roots are found all at once, so only other equations are solved in parallel
+        equation_solver.set_workers(workers)
 
     solutions = equation_solver.find_all_solutions(min, max, {})
 
     return solutions
+
+
+def start_solving_equation(equation_string, min, max):
+    #the same as solve_equation(), but returns a SolutionSearch so the equation can be solved a bit at a time
+    equation_solver, min, max = setup_equation_solver(equation_string, min, max)
+
+    if equation_solver.get_polynomial_coefficients() is None:
+        #the adaptive search finds solutions steadily from left to right, so they can be shown while it carries on
+        equation_solver.set_solve_method(ArbitraryEquation.ADAPTIVE_METHOD)
+
+    return SolutionSearch(equation_solver, min, max, {})
@@ -5,6 +5,9 @@ import random
 import equation_utils
 import calculator_utils
 
+if calculator_utils.ARRAYS_SUPPORTED:
+    import numpy
+
 
 class Axis:
     PIXEL_INDENT_X = 200
@@ -272,9 +275,8 @@ class Graph:
 
         return valid
     
-    def get_points_on_graph(self):
-        #a set is used to remove duplicates (no need to draw a pixel twice)
-        points_on_graph = set()
+    def get_x_samples(self):
+        #every x value the graph is drawn at (from left to right), with the pixel it is in
         for pixel_x in range(Axis.PIXEL_INDENT_X, gui.SCREEN_WIDTH):
             axis_x = self.axis.pixel_x_to_axis_x(pixel_x)
 
@@ -282,16 +284,26 @@ class Graph:
                 fraction_into_pixel = sample_num / Graph.RESOLUTION
 
                 x = axis_x + self.axis.pixel_width * fraction_into_pixel
-                y_values = self.get_y_values(x)
 
-                #check if this x value results in an error, like dividing by 0
-                if y_values is None: continue
+                yield pixel_x, x
+
+    def add_points(self, points_on_graph, pixel_x, y_values):
+        for y in y_values:
+            pixel_y = self.axis.axis_y_to_pixel_y(y)
+
+            coordinate = (pixel_x, pixel_y)
+            points_on_graph.add(coordinate)
+    
+    def get_points_on_graph(self):
+        #a set is used to remove duplicates (no need to draw a pixel twice)
+        points_on_graph = set()
+        for pixel_x, x in self.get_x_samples():
+            y_values = self.get_y_values(x)
 
-                for y in y_values:
-                    pixel_y = self.axis.axis_y_to_pixel_y(y)
+            #check if this x value results in an error, like dividing by 0
+            if y_values is None: continue
 
-                    coordinate = (pixel_x, pixel_y)
-                    points_on_graph.add(coordinate)
+            self.add_points(points_on_graph, pixel_x, y_values)
 
         return points_on_graph
 
@@ -316,6 +328,10 @@ class ExplicitGraph(Graph):
 
         self.function_expression = self.extract_function()
 
+        #the function is evaluated thousands of times each time the
+        #view changes, so compile it once rather than interpreting it
+        self.compiled_function = self.function_expression.get_compiled_function()
+
     def extract_function(self):
         #equation string will be in form y=f(x), we only want the f(x) part
         lhs, rhs = self.equation_string.split("=")
@@ -325,17 +341,16 @@ class ExplicitGraph(Graph):
         else:
             func = lhs  #f(x)=y
 
-        func_expression = calculator_utils.AlgebraicInfixExpression(func)
+        func_expression = calculator_utils.get_expression(func)
 
         return func_expression
     
     def get_y_values(self, x_value):
-        substitution = {"x" : x_value}
-
         try:
-            y = self.function_expression.evaluate(substitution)
-        except ZeroDivisionError:
+            y = self.compiled_function(x=x_value)
+        except (ZeroDivisionError, ValueError):
             #for graphs like y=1/x, substituting x=0 gives a divide by zero error
+            #and for graphs like y=sqrt(x), substituting x=-1 gives a math domain error
             y = None
 
         #y can be None if the equation is y= (nothing given on right hand side)
@@ -343,8 +358,42 @@ class ExplicitGraph(Graph):
 
         return [y]
     
+    def get_points_on_graph(self):
+        #polymorphism - overrides Graph.get_points_on_graph() to evaluate the
+        #function for every sample in one go, if numpy is available
+        if not calculator_utils.ARRAYS_SUPPORTED:
+            return super().get_points_on_graph()
+
+        pixel_xs = numpy.repeat(numpy.arange(Axis.PIXEL_INDENT_X, gui.SCREEN_WIDTH), Graph.RESOLUTION)
+        fractions_into_pixel = numpy.tile(numpy.arange(Graph.RESOLUTION) / Graph.RESOLUTION, 
+                                          gui.SCREEN_WIDTH - Axis.PIXEL_INDENT_X)
+
+        #the same as Axis.pixel_x_to_axis_x(), but for every pixel at once
+        fractions_along = (pixel_xs - Axis.PIXEL_INDENT_X) / (gui.SCREEN_WIDTH - Axis.PIXEL_INDENT_X)
+        xs = self.axis.min_x + fractions_along * self.axis.width + self.axis.pixel_width * fractions_into_pixel
+
+        ys = self.function_expression.evaluate_array(xs)
+        if ys is None: return set()
+
+        #samples which gave an error (like dividing by 0) are NaN, so skip them
+        valid = numpy.isfinite(ys)
+
+        #the same as Axis.axis_y_to_pixel_y(), but for every sample at once
+        fractions_up = (ys[valid] - self.axis.min_y) / self.axis.height
+        scaled_ys = numpy.clip(gui.SCREEN_HEIGHT * fractions_up, -1e9, 1e9)  #stop huge values overflowing
+        pixel_ys = gui.SCREEN_HEIGHT - scaled_ys.astype(int)
+
+        #a set is used to remove duplicates (no need to draw a pixel twice)
+        points_on_graph = set(zip(pixel_xs[valid].tolist(), pixel_ys.tolist()))
+
+        return points_on_graph
+    
 
 class ImplicitGraph(Graph):
+    #most x values are solved by following the solutions from the previous x value. The 
+    #whole y range is only searched every this many x values, to find any new branches
+    GLOBAL_SEARCH_INTERVAL = 16
+
     def __init__(self, equation_string, window, axis, colour):
         super().__init__(equation_string, window, axis, colour)
 
@@ -353,8 +402,8 @@ class ImplicitGraph(Graph):
     def get_equation_solver(self):
         left_string, right_string = self.equation_string.split("=")
 
-        lhs_expression = calculator_utils.AlgebraicInfixExpression(left_string)
-        rhs_expression = calculator_utils.AlgebraicInfixExpression(right_string)
+        lhs_expression = calculator_utils.get_expression(left_string)
+        rhs_expression = calculator_utils.get_expression(right_string)
 
         #we need the equation to be solved quickly, 
         #not very accurately (so set fast_solve to True)
@@ -362,6 +411,9 @@ class ImplicitGraph(Graph):
                                                            rhs_expression, 
                                                            "y", 
                                                            True)
+        
+        #the same columns are solved again when the graph is redrawn at a view it has already been drawn at
+        equation_solver.set_use_solution_cache(True)
 
         return equation_solver
 
@@ -378,6 +430,75 @@ class ImplicitGraph(Graph):
             return None
         
         return y_values
+    
+    def follow_y_values(self, previous_y_values, x_value):
+        #the graph moves very little between x values, so Newton-Raphson from each previous
+        #y value quickly finds the solution on the same branch of the graph (continuation)
+        known_substitutions = {"x" : x_value}
+
+        try:
+            y_values = self.equation_solver.continue_solutions(previous_y_values, 
+                                                               self.axis.min_y, 
+                                                               self.axis.max_y, 
+                                                               known_substitutions)
+        except:
+            return None
+        
+        return y_values
+    
+    def get_points_on_graph(self):
+        #the x values are solved in order, following each branch of the graph on from the
+        #previous x value. When the whole y range is searched, any new branches found are
+        #followed back to the previous search, so the start of a branch is not missed
+        points_on_graph = set()
+
+        previous_y_values = None
+        followed_samples = []  #the x values found by following branches since the last search
+        branch_ended = False
+
+        for pixel_x, x in self.get_x_samples():
+            #a branch ending (like at the edge of a circle) is often where a new one starts
+            search_whole_range = (previous_y_values is None or branch_ended or 
+                                  len(followed_samples) >= ImplicitGraph.GLOBAL_SEARCH_INTERVAL)
+
+            if not search_whole_range:
+                y_values = self.follow_y_values(previous_y_values, x)
+                followed_samples.append((pixel_x, x))
+
+                branch_ended = y_values is not None and len(y_values) < len(previous_y_values)
+            else:
+                y_values = self.get_y_values(x)
+                branch_ended = False
+
+                if y_values is not None and previous_y_values is not None:
+                    self.add_new_branches(points_on_graph, previous_y_values, y_values, x, followed_samples)
+
+                followed_samples = []
+
+            previous_y_values = y_values
+
+            #check if this x value results in an error, like dividing by 0
+            if y_values is None: continue
+
+            self.add_points(points_on_graph, pixel_x, y_values)
+
+        return points_on_graph
+    
+    def add_new_branches(self, points_on_graph, previous_y_values, y_values, x, followed_samples):
+        #find the y values which are not on a branch that was being followed, and follow
+        #them backwards through the x values since the last search of the whole y range
+        followed_y_values = equation_utils.RootSet(equation_utils.ArbitraryEquation.TOLERANCE)
+        for y in self.follow_y_values(previous_y_values, x) or []:
+            followed_y_values.add(y)
+
+        new_y_values = [y for y in y_values if not followed_y_values.contains(y)]
+
+        for pixel_x, sample_x in reversed(followed_samples):
+            if len(new_y_values) == 0: break
+
+            new_y_values = self.follow_y_values(new_y_values, sample_x) or []
+
+            self.add_points(points_on_graph, pixel_x, new_y_values)
 
 
 class GrapherMenu:
@@ -37,6 +37,9 @@ class SimulEquationMenu:
         self.solution_text = self.setup_solution_text()
 
         self.equations = self.create_equations(SimulEquationMenu.START_NUM_EQUATIONS)
+
+        #the last system solved, so its decomposition can be updated when only a few coefficients change
+        self.equation_system = None
         
     get_go_back = lambda self: self.go_back
 
@@ -100,9 +103,17 @@ class SimulEquationMenu:
             equation_system = simul_equation_utils.SystemEquations(equation_variables, 
                                                                    equation_constants)
             
+            #the coefficients are often kept the same while the constants are changed, 
+            #or only a few of them are changed since the last solve
+            equation_system.set_use_factorisation_cache(True)
+            equation_system.set_previous_system(self.equation_system)
+
+            self.equation_system = equation_system
+
             solutions = equation_system.solve()
         except:
-            #the system of equations have no unique solution, or there is an error in the coefficients
+            #the system of equations have no unique solution (or is too ill-conditioned to solve accurately), 
+            #or there is an error in the coefficients
             solutions = None
 
         return solutions
@@ -1,8 +1,33 @@
+import array
+import operator
+import calculator_utils
+
+
+#the factorisation cache keeps the LU decompositions of this many coefficient matrixes, 
+#so solving again with only the constants changed just needs the substitution
+FACTORISATION_CACHE_SIZE = 32
+
+
 class SystemEquations:
     def __init__(self, equation_variables, equation_constants):
         self.equation_variables = equation_variables
         self.equation_constants = equation_constants
 
+        #whether decompositions are stored in (and looked up from) FACTORISATION_CACHE
+        self.use_factorisation_cache = False
+
+        #a system with a few different coefficients, whose decomposition can be updated 
+        #instead of factorising the coefficient matrix again
+        self.previous_system = None
+
+        self.decomposition = None
+
+    def set_use_factorisation_cache(self, new_use_factorisation_cache):
+        self.use_factorisation_cache = new_use_factorisation_cache
+
+    def set_previous_system(self, new_previous_system):
+        self.previous_system = new_previous_system
+
     def build_constant_matrix(self):
         constant_matrix_items = [[constant] for constant in self.equation_constants]
         matrix_object = Matrix(constant_matrix_items)
@@ -18,105 +43,236 @@ class SystemEquations:
 
         return matrix_object
     
-    def solve(self):
-        coefficient_matrix = self.build_coefficient_matrix()
-        constant_matrix = self.build_constant_matrix()
+    def get_cache_key(self):
+        #the decomposition only depends on the coefficients, not the constants
+        return tuple(tuple(variables) for variables in self.equation_variables)
+
+    def get_decomposition(self):
+        if self.decomposition is not None:
+            return self.decomposition
+        
+        decomposition = None
+
+        if self.use_factorisation_cache:
+            cache_key = self.get_cache_key()
+            decomposition = FACTORISATION_CACHE.get_decomposition(cache_key)
 
-        inv_coefficient_matrix = coefficient_matrix.inverse()
+        if decomposition is None:
+            decomposition = self.update_previous_decomposition()
 
-        result_matrix = inv_coefficient_matrix.matrix_multiply(constant_matrix)
-        result_values = [row[0] for row in result_matrix.items]
+            if decomposition is None:
+                decomposition = self.build_coefficient_matrix().lu_decompose()
+
+            if self.use_factorisation_cache:
+                FACTORISATION_CACHE.add_decomposition(cache_key, decomposition)
+
+        self.decomposition = decomposition
+
+        #the previous system isn't needed anymore, and keeping it would keep every system before it
+        self.previous_system = None
+
+        return decomposition
+    
+    def update_previous_decomposition(self):
+        #return the decomposition of the previous system with a rank-one update for each changed row, 
+        #or None if there is no previous decomposition or the updates would be inaccurate
+        previous_system = self.previous_system
+        if previous_system is None or previous_system.decomposition is None: 
+            return None
+        
+        if len(previous_system.equation_variables) != len(self.equation_variables):
+            return None
+        
+        decomposition = previous_system.decomposition
+
+        for row_index, (variables, previous_variables) in enumerate(zip(self.equation_variables, 
+                                                                         previous_system.equation_variables)):
+            if list(variables) == list(previous_variables): continue
+
+            row_change = [variable - previous_variable 
+                          for variable, previous_variable in zip(variables, previous_variables)]
+            
+            decomposition = decomposition.update_row(row_index, row_change)
+            if decomposition is None: 
+                return None
+
+        return decomposition
+
+    def solve(self):
+        #factorise the coefficient matrix and solve by substitution, 
+        #rather than forming its inverse
+        decomposition = self.get_decomposition()
+
+        result_values = decomposition.solve(self.equation_constants)
 
         return result_values
+
+    def solve_many(self, constant_lists):
+        #solve the equations with each list of constants in place of equation_constants, 
+        #reusing one decomposition of the coefficient matrix
+        decomposition = self.get_decomposition()
+
+        return decomposition.solve_many(constant_lists)
     
 
 class Matrix:
-    def __init__(self, items):
-        self.items = items
-
-        self.width = len(items[0])
-        self.height = len(items)
+    #the items are stored in one contiguous array of floats. Item (row, col) is at
+    #data[offset + row * row_stride + col * col_stride], so a transpose or a submatrix
+    #can be a view that shares the data of the matrix it came from
+    __slots__ = ("data", "height", "width", "offset", "row_stride", "col_stride")
+
+    def __init__(self, items=None, data=None, shape=None, offset=0, strides=None):
+        if items is not None:
+            #copy a list of rows into a new array
+            self.data = array.array("d", [item for row in items for item in row])
+            self.height = len(items)
+            self.width = len(items[0])
+        else:
+            #a view of existing data
+            self.data = data
+            self.height, self.width = shape
+
+        self.offset = offset
+        self.row_stride, self.col_stride = (self.width, 1) if strides is None else strides
+
+    def create_view(self, shape, offset, strides):
+        #views keep the class of the matrix, so the view of a SquareMatrix is also a SquareMatrix
+        return type(self)(data=self.data, shape=shape, offset=offset, strides=strides)
+
+    get_item = lambda self, row_index, col_index: self.data[self.offset + 
+                                                            row_index * self.row_stride + 
+                                                            col_index * self.col_stride]
+
+    def set_item(self, row_index, col_index, value):
+        self.data[self.offset + row_index * self.row_stride + col_index * self.col_stride] = value
+
+    def get_row_values(self, row_index):
+        #return a copy of one row as an array
+        start = self.offset + row_index * self.row_stride
+        stop = start + (self.width - 1) * self.col_stride + 1
+
+        return self.data[start:stop:self.col_stride]
+
+    def get_column_values(self, col_index):
+        #return a copy of one column as an array
+        start = self.offset + col_index * self.col_stride
+        stop = start + (self.height - 1) * self.row_stride + 1
+
+        return self.data[start:stop:self.row_stride]
+
+    def get_values(self):
+        #return a copy of the items in row order, as one contiguous array
+        if self.row_stride == self.width and self.col_stride == 1:
+            return self.data[self.offset:self.offset + self.width * self.height]
+
+        values = array.array("d")
+        for row_index in range(self.height):
+            values.extend(self.get_row_values(row_index))
+
+        return values
+
+    def get_items(self):
+        #return a copy of the items as a list of rows
+        return [self.get_row_values(row_index).tolist() for row_index in range(self.height)]
+
+    def get_row(self, row_index):
+        #return a view of one row
+        return Matrix(data=self.data, 
+                      shape=(1, self.width), 
+                      offset=self.offset + row_index * self.row_stride, 
+                      strides=(self.row_stride, self.col_stride))
+
+    def get_column(self, col_index):
+        #return a view of one column
+        return Matrix(data=self.data, 
+                      shape=(self.height, 1), 
+                      offset=self.offset + col_index * self.col_stride, 
+                      strides=(self.row_stride, self.col_stride))
+
+    def get_submatrix(self, top, left, height, width):
+        #return a view of the block of items with its top left item at (top, left)
+        return Matrix(data=self.data, 
+                      shape=(height, width), 
+                      offset=self.offset + top * self.row_stride + left * self.col_stride, 
+                      strides=(self.row_stride, self.col_stride))
 
     def matrix_multiply(self, other_matrix):
-        #multiply two matrixes together \nd return the result matrix
-        
-        #create blank 2D array       
-        result_items = [[None for _ in range(other_matrix.width)] for _ in range(self.height)]
-
-        for row_inx in range(self.height):
-            for col_inx in range(other_matrix.width):
-                sum = 0
-                for element_inx in range(self.width):
-                    sum += self.items[row_inx][element_inx] * other_matrix.items[element_inx][col_inx]
+        #multiply two matrixes together and return the result matrix. 
+        #each row and column is copied once, rather than indexing every item for every product
+        rows = [self.get_row_values(row_index) for row_index in range(self.height)]
+        columns = [other_matrix.get_column_values(col_index) for col_index in range(other_matrix.width)]
 
-                result_items[row_inx][col_inx] = sum
+        result_data = array.array("d")
+        for row in rows:
+            result_data.extend([sum(map(operator.mul, row, column)) for column in columns])
 
-        result_matrix = Matrix(result_items)
+        result_matrix = Matrix(data=result_data, shape=(self.height, other_matrix.width))
 
         return result_matrix
     
     def scalar_multiply(self, scalar):
         #multiply a matrix by a scalar
-        scaled_items = [[item * scalar for item in row] for row in self.items]
-        scaled_matrix = Matrix(scaled_items)
+        scaled_data = array.array("d", [item * scalar for item in self.get_values()])
+        scaled_matrix = Matrix(data=scaled_data, shape=(self.height, self.width))
 
         return scaled_matrix
     
     def transpose(self):
-        new_items = []
-        for col_index in range(self.width):
-            column = [self.items[row_index][col_index] for row_index in range(self.height)]
-            new_items.append(column)  #the columns of the old matrix become the rows of the new ones
-
-        return Matrix(new_items)
+        #the columns of the old matrix become the rows of the new one, 
+        #so the transpose is a view with the strides swapped
+        return Matrix(data=self.data, 
+                      shape=(self.width, self.height), 
+                      offset=self.offset, 
+                      strides=(self.col_stride, self.row_stride))
     
 
 class SquareMatrix(Matrix):
-    def __init__(self, items):
-        super().__init__(items)
+    __slots__ = ()
 
     def scalar_multiply(self, scalar):
         #polymorphism - overrides the scalar_multiply() method from Matrix
-        scaled_items = [[item * scalar for item in row] for row in self.items]
-        scaled_matrix = SquareMatrix(scaled_items)
+        scaled_data = array.array("d", [item * scalar for item in self.get_values()])
+        scaled_matrix = SquareMatrix(data=scaled_data, shape=(self.height, self.width))
 
         return scaled_matrix
     
     def transpose(self):
         #polymorphism - overrides the transpose() method from Matrix
-        new_items = []
-        for col_index in range(self.width):
-            column = [self.items[row_index][col_index] for row_index in range(self.height)]
-
-            #the columns of the old matrix become the rows of the new ones
-            new_items.append(column)
-
-        return SquareMatrix(new_items)
+        return self.create_view((self.width, self.height), self.offset, (self.col_stride, self.row_stride))
 
     def determinant(self):
-        #return the determinant of the matrix
+        #return the determinant of the matrix, from the pivots of its LU decomposition
+        return self.lu_decompose().determinant()
+
+    def cofactor_determinant(self):
+        #return the determinant of the matrix by cofactor expansion, which takes O(n!) time. 
+        #kept as a reference to check determinant() against
         if self.width == 2 and self.height == 2:
             #det = a*d - b*c
-            return self.items[0][0] * self.items[1][1] - self.items[0][1] * self.items[1][0]
+            return self.get_item(0, 0) * self.get_item(1, 1) - self.get_item(0, 1) * self.get_item(1, 0)
         
         det = 0
         for remove_y in range(self.width):
             #recursively get the determinants of each matrix minor from the top row
             minor = self.get_minor(0, remove_y)
-            minor_det = minor.determinant()
+            minor_det = minor.cofactor_determinant()
 
             if remove_y % 2 == 0:
-                multiplier = self.items[0][remove_y]
+                multiplier = self.get_item(0, remove_y)
             else:
-                multiplier = -self.items[0][remove_y]
+                multiplier = -self.get_item(0, remove_y)
 
             det += multiplier * minor_det
 
         return det
     
+    def lu_decompose(self):
+        return LUDecomposition(self)
+    
     def get_minor(self, remove_x, remove_y):
+        #the minor leaves out a row and a column, so it can't be a view and the items are copied
         minor_items = []
-        for row_index, row in enumerate(self.items):
+        for row_index, row in enumerate(self.get_items()):
             if row_index == remove_x: continue
 
             minor_row = [item for col_index, item in enumerate(row) if col_index != remove_y]
@@ -131,7 +287,7 @@ class SquareMatrix(Matrix):
         for x in range(self.width):
             for y in range(self.height):
                 minor = self.get_minor(x, y)
-                minor_det = minor.determinant()
+                minor_det = minor.cofactor_determinant()
 
                 minor_matrix[x][y] = minor_det
 
@@ -149,11 +305,23 @@ class SquareMatrix(Matrix):
         return SquareMatrix(cofactor_matrix_items)
     
     def inverse(self):
+        #column i of the inverse is the solution of Ax = e_i, where e_i is column i of the identity matrix, 
+        #so the inverse comes from solving for each column with one LU decomposition
+        identity_columns = [[1 if row_index == col_index else 0 for row_index in range(self.height)] 
+                            for col_index in range(self.width)]
+
+        inverse_columns = self.lu_decompose().solve_many(identity_columns)
+
+        return SquareMatrix(inverse_columns).transpose()
+
+    def cofactor_inverse(self):
+        #return the inverse of the matrix from its adjoint, which takes O(n!) time. 
+        #kept as a reference to check inverse() against
         if self.width == 2 and self.height == 2:
-            new_items = [[self.items[1][1], -self.items[0][1]],
-                         [-self.items[1][0], self.items[0][0]]]
+            new_items = [[self.get_item(1, 1), -self.get_item(0, 1)],
+                         [-self.get_item(1, 0), self.get_item(0, 0)]]
             
-            scalar = 1 / self.determinant()
+            scalar = 1 / self.cofactor_determinant()
 
             inverse_mat = SquareMatrix(new_items)
             scaled_inverse_mat = inverse_mat.scalar_multiply(scalar)
@@ -165,8 +333,209 @@ class SquareMatrix(Matrix):
         
         adjoint_matrix = cofactor_matrix.transpose()
 
-        scalar = 1 / self.determinant()
+        scalar = 1 / self.cofactor_determinant()
 
         inverse_mat = adjoint_matrix.scalar_multiply(scalar)
 
-        return inverse_mat
\ No newline at end of file
+        return inverse_mat
+
+
+class LUDecomposition:
+    #a pivot smaller than this (relative to the largest item in the matrix) 
+    #means the solution would be mostly rounding error
+    PIVOT_TOLERANCE = 1e-12
+
+    def __init__(self, square_matrix):
+        self.size = square_matrix.width
+
+        #L (below the diagonal, with an implied diagonal of ones) and U (the rest) share one 
+        #array in row order, and row_order[i] is the row of the original matrix that ended up in row i
+        self.lu_data = square_matrix.get_values()
+        self.row_order = list(range(self.size))
+
+        self.pivots = []
+        self.num_row_swaps = 0
+
+        self.factorise()
+
+    def factorise(self):
+        #Doolittle's method with partial pivoting, storing the multipliers of L in place of the zeros of U. 
+        #each column is finished one at a time, and every item in it only needs one dot product 
+        #of part of its row with the items above it in the column, so there is no loop over single items
+        lu_data = self.lu_data
+        size = self.size
+
+        largest_item = max(map(abs, lu_data), default=0)
+        self.tolerance = largest_item * LUDecomposition.PIVOT_TOLERANCE
+
+        for col_index in range(size):
+            column = lu_data[col_index::size]
+
+            for row_index in range(1, size):
+                #items above the diagonal belong to U, and the rest are divided by the pivot later to be in L
+                num_products = min(row_index, col_index)
+                row_start = row_index * size
+
+                column[row_index] -= sum(map(operator.mul, lu_data[row_start:row_start + num_products], column[:num_products]))
+
+            #use the largest remaining item in the column as the pivot, so the multipliers are at most 1
+            pivot_index = max(range(col_index, size), key=lambda row_index: abs(column[row_index]))
+            pivot = column[pivot_index]
+
+            self.pivots.append(pivot)
+
+            if pivot_index != col_index:
+                pivot_start = col_index * size
+                swap_start = pivot_index * size
+                lu_data[pivot_start:pivot_start + size], lu_data[swap_start:swap_start + size] = (
+                    lu_data[swap_start:swap_start + size], lu_data[pivot_start:pivot_start + size])
+                column[col_index], column[pivot_index] = column[pivot_index], column[col_index]
+
+                self.row_order[col_index], self.row_order[pivot_index] = self.row_order[pivot_index], self.row_order[col_index]
+                self.num_row_swaps += 1
+
+            #if the pivot is zero then the rest of the column is already zero
+            if pivot != 0:
+                for row_index in range(col_index + 1, size):
+                    column[row_index] /= pivot
+
+            lu_data[col_index::size] = column
+
+    get_pivots = lambda self: self.pivots
+
+    has_unique_solution = lambda self: all(abs(pivot) > self.tolerance for pivot in self.pivots)
+
+    def determinant(self):
+        #the determinant of U is the product of the pivots, and each row swap flips the sign
+        det = -1 if self.num_row_swaps % 2 == 1 else 1
+        for pivot in self.pivots:
+            det *= pivot
+
+        return det
+
+    def check_pivots(self):
+        #a zero pivot means there is no unique solution, and a tiny one 
+        #means the solution would be mostly rounding error
+        for pivot in self.pivots:
+            if pivot == 0:
+                raise Exception("Singular matrix")
+            elif abs(pivot) <= self.tolerance:
+                raise Exception("Ill-conditioned matrix")
+
+    def solve(self, constants):
+        self.check_pivots()
+
+        return self.substitute(constants)
+
+    def solve_many(self, constant_lists):
+        #the pivots only need to be checked once for every list of constants
+        self.check_pivots()
+
+        return [self.substitute(constants) for constants in constant_lists]
+
+    def substitute(self, constants):
+        #solve Ax = b as LUx = Pb, by forward substitution for y in Ly = Pb 
+        #and then back substitution for x in Ux = y
+        lu_data = self.lu_data
+        size = self.size
+
+        values = [constants[row_index] for row_index in self.row_order]
+
+        for row_index in range(size):
+            row_start = row_index * size
+            values[row_index] -= sum(map(operator.mul, lu_data[row_start:row_start + row_index], values))
+
+        for row_index in reversed(range(size)):
+            row_start = row_index * size
+            values[row_index] -= sum(map(operator.mul, lu_data[row_start + row_index + 1:row_start + size], 
+                                         values[row_index + 1:]))
+
+            values[row_index] /= lu_data[row_start + row_index]
+
+        return values
+
+    def update_row(self, row_index, row_change):
+        #return the decomposition of the matrix with row_change added to one of its rows, 
+        #or None if the update would be inaccurate and the matrix should be factorised again
+        return UpdatedDecomposition(self, []).update_row(row_index, row_change)
+
+
+class UpdatedDecomposition(LUDecomposition):
+    #the decomposition of a matrix that differs from a factorised matrix A by a few rows. 
+    #changing row i by v is adding the rank-one matrix e_i v^T, so by the Sherman-Morrison formula
+    #(A + e_i v^T)^-1 b = A^-1 b - z (v.A^-1 b) / (1 + v.z), where z = A^-1 e_i. 
+    #this takes O(n^2) time for each update instead of O(n^3) to factorise again
+
+    #after this many updates the matrix is factorised again, 
+    #so rounding errors don't build up and solving doesn't get slower
+    MAX_UPDATES = 8
+
+    #an update is inaccurate if 1 + v.z is this small relative to its terms, 
+    #because the updated matrix is nearly singular
+    STABILITY_TOLERANCE = 1e-8
+
+    def __init__(self, base_decomposition, updates):
+        self.base_decomposition = base_decomposition
+        self.size = base_decomposition.size
+
+        #each update is a tuple of (row_change, z, 1 + v.z)
+        self.updates = updates
+
+    get_pivots = lambda self: self.base_decomposition.get_pivots()
+
+    has_unique_solution = lambda self: self.base_decomposition.has_unique_solution()
+
+    def determinant(self):
+        #by the matrix determinant lemma, det(A + e_i v^T) = det(A) * (1 + v.z)
+        det = self.base_decomposition.determinant()
+        for _, _, denominator in self.updates:
+            det *= denominator
+
+        return det
+    
+    def check_pivots(self):
+        #polymorphism - overrides the check_pivots() method from LUDecomposition. 
+        #the updates are only made when the updated matrix is not nearly singular
+        self.base_decomposition.check_pivots()
+
+    def substitute(self, constants):
+        #polymorphism - overrides the substitute() method from LUDecomposition
+        values = self.base_decomposition.substitute(constants)
+
+        for row_change, inverse_column, denominator in self.updates:
+            scale = sum(map(operator.mul, row_change, values)) / denominator
+            values = [value - scale * inverse_item for value, inverse_item in zip(values, inverse_column)]
+
+        return values
+
+    def update_row(self, row_index, row_change):
+        #polymorphism - overrides the update_row() method from LUDecomposition
+        if len(self.updates) >= UpdatedDecomposition.MAX_UPDATES or not self.has_unique_solution():
+            return None
+        
+        unit_column = [1 if index == row_index else 0 for index in range(self.size)]
+        inverse_column = self.substitute(unit_column)
+
+        products = list(map(operator.mul, row_change, inverse_column))
+        denominator = 1 + sum(products)
+
+        if abs(denominator) <= UpdatedDecomposition.STABILITY_TOLERANCE * (1 + sum(map(abs, products))):
+            return None
+
+        updates = self.updates + [(list(row_change), inverse_column, denominator)]
+
+        return UpdatedDecomposition(self.base_decomposition, updates)
+
+
+class FactorisationCache(calculator_utils.LRUCache):
+    def get_decomposition(self, key):
+        #return the decomposition stored for the key, or None if it is not in the cache. 
+        #solving doesn't change a decomposition, so the stored one is returned without copying it
+        return self.get(key)
+        
+    def add_decomposition(self, key, decomposition):
+        self.add(key, decomposition)
+
+
+#a single cache is shared by every system of equations
+FACTORISATION_CACHE = FactorisationCache(FACTORISATION_CACHE_SIZE)
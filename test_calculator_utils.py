@@ -0,0 +1,130 @@
+import math
+import unittest
+import calculator_utils
+
+
+class TestEvaluate(unittest.TestCase):
+    def test_evaluate_expression(self):
+        self.assertEqual(calculator_utils.evaluate_expression("3-(-2)"), 5)
+        self.assertEqual(calculator_utils.evaluate_expression("2(3+4)"), 14)
+        self.assertEqual(calculator_utils.evaluate_expression("2+3*4^2"), 50)
+
+    def test_implied_multiplication_with_constants(self):
+        self.assertAlmostEqual(calculator_utils.evaluate_expression("π2"), 2 * math.pi)
+        self.assertAlmostEqual(calculator_utils.evaluate_expression("e2"), 2 * math.e)
+        self.assertAlmostEqual(calculator_utils.evaluate_expression("2π"), 2 * math.pi)
+        self.assertAlmostEqual(calculator_utils.evaluate_expression("ππ"), math.pi ** 2)
+
+    def test_invalid_number(self):
+        with self.assertRaisesRegex(ValueError, "could not convert string to float: '1.2.3'"):
+            calculator_utils.evaluate_expression("1.2.3")
+
+        expression = calculator_utils.get_expression("1.2.3x")
+        with self.assertRaises(ValueError):
+            expression.get_compiled_function()(x=1.0)
+
+    def test_compiled_function_matches_evaluate(self):
+        for expression_string in ("x^3-2x+1", "sin(x)^2+cos(x)^2", "sqrt(x^2+1)/(x+3)", "3cos(x)^2-(x-1)(x+2)/5"):
+            expression = calculator_utils.get_expression(expression_string)
+
+            for x in (-2.5, 0.5, 4.0):
+                self.assertAlmostEqual(expression.get_compiled_function()(x=x), expression.evaluate({"x" : x}))
+
+
+class TestDerivatives(unittest.TestCase):
+    def assert_derivative(self, expression_string, x, expected_derivative):
+        expression = calculator_utils.get_expression(expression_string)
+
+        value, derivative = expression.get_compiled_function("x")(x=x)
+        self.assertAlmostEqual(value, expression.evaluate({"x" : x}))
+        self.assertAlmostEqual(derivative, expected_derivative)
+
+        #dual numbers give the same exact derivative without compiling
+        self.assertAlmostEqual(expression.evaluate_dual("x", {"x" : x})[1], expected_derivative)
+
+    def test_polynomial(self):
+        self.assert_derivative("x^3-2x+1", 2.0, 10.0)
+
+    def test_functions(self):
+        self.assert_derivative("sin(x)", 1.0, math.cos(1.0))
+        self.assert_derivative("ln(x)", 4.0, 0.25)
+        self.assert_derivative("sqrt(x)", 4.0, 0.25)
+        self.assert_derivative("tan(x)", 0.5, 1 / math.cos(0.5) ** 2)
+
+    def test_chain_and_quotient_rules(self):
+        self.assert_derivative("sin(x^2)", 1.5, 2 * 1.5 * math.cos(1.5 ** 2))
+        self.assert_derivative("1/(x+1)", 1.0, -0.25)
+        self.assert_derivative("2^x", 3.0, 8 * math.log(2))
+
+
+class TestIntervals(unittest.TestCase):
+    def assert_interval_contains(self, expression_string, low, high):
+        #every value of the expression between low and high must be in its interval
+        expression = calculator_utils.get_expression(expression_string)
+        interval = expression.evaluate_interval({"x" : (low, high)})
+
+        for step in range(101):
+            x = low + (high - low) * step / 100
+            self.assertTrue(interval.contains(expression.evaluate({"x" : x})))
+
+        return interval
+
+    def test_polynomial(self):
+        interval = self.assert_interval_contains("x^3-2x+1", 0, 1)
+
+        self.assertLessEqual(interval.low, -1)
+        self.assertGreaterEqual(interval.high, 2)
+
+    def test_functions(self):
+        self.assert_interval_contains("sin(x)", -1, 2)
+        self.assert_interval_contains("cos(x)*x", 0, 7)
+        self.assert_interval_contains("sqrt(x)+ln(x)", 0.5, 4)
+
+    def test_sin_turning_point(self):
+        interval = calculator_utils.get_expression("sin(x)").evaluate_interval({"x" : (1, 2)})
+
+        self.assertGreaterEqual(interval.high, 1)
+
+    def test_sqrt_outside_domain(self):
+        interval = calculator_utils.get_expression("sqrt(x)").evaluate_interval({"x" : (-2, -1)})
+
+        self.assertTrue(interval.is_empty())
+
+    def test_compiled_interval_gradient(self):
+        interval_function = calculator_utils.get_expression("x^2").get_compiled_interval_function("x")
+        interval, gradient = interval_function(x=calculator_utils.Interval(1, 2))
+
+        self.assertTrue(interval.contains(1) and interval.contains(4))
+        self.assertTrue(gradient.contains(2) and gradient.contains(4))
+        self.assertFalse(gradient.contains_zero())
+
+
+class TestExpressionGraph(unittest.TestCase):
+    def test_constant_folding_and_common_subexpressions(self):
+        report = calculator_utils.get_expression("2*π*x+sin(2*π*x)").get_expression_graph().get_optimisation_report()
+
+        self.assertEqual(report["operations_before"], 6)
+        self.assertEqual(report["operations_after"], 3)
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_least_recently_used_is_removed(self):
+        cache = calculator_utils.LRUCache(2)
+        cache.add("a", 1)
+        cache.add("b", 2)
+        cache.get("a")
+        cache.add("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get_size(), 2)
+
+    def test_expression_cache_ignores_spaces(self):
+        expression_cache = calculator_utils.ExpressionCache(4)
+
+        self.assertIs(expression_cache.get_expression("x + 1"), expression_cache.get_expression("x+1"))
+        self.assertEqual(expression_cache.get_hits(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
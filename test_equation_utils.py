@@ -0,0 +1,154 @@
+import math
+import unittest
+import calculator_utils
+import equation_utils
+
+
+ALL_METHODS = (equation_utils.ArbitraryEquation.NEWTON_METHOD,
+               equation_utils.ArbitraryEquation.BRACKETING_METHOD,
+               equation_utils.ArbitraryEquation.VECTORISED_METHOD,
+               equation_utils.ArbitraryEquation.POLYNOMIAL_METHOD,
+               equation_utils.ArbitraryEquation.ADAPTIVE_METHOD)
+
+#the Newton-Raphson methods find every value of an equation like x=x as a solution, so they are left out of those tests
+SEARCH_METHODS = (equation_utils.ArbitraryEquation.BRACKETING_METHOD,
+                  equation_utils.ArbitraryEquation.POLYNOMIAL_METHOD,
+                  equation_utils.ArbitraryEquation.ADAPTIVE_METHOD)
+
+
+def create_equation_solver(equation_string, solve_method):
+    lhs, rhs = equation_string.split("=")
+
+    equation_solver = equation_utils.ArbitraryEquation(calculator_utils.get_expression(lhs),
+                                                       calculator_utils.get_expression(rhs),
+                                                       "x",
+                                                       False)
+    equation_solver.set_solve_method(solve_method)
+
+    return equation_solver
+
+
+class TestArbitraryEquation(unittest.TestCase):
+    def setUp(self):
+        equation_utils.SOLUTION_CACHE.clear()
+
+    def assert_solutions(self, equation_string, expected_solutions, solve_methods=ALL_METHODS, min=-100, max=100):
+        for solve_method in solve_methods:
+            with self.subTest(equation=equation_string, solve_method=solve_method):
+                solutions = create_equation_solver(equation_string, solve_method).find_all_solutions(min, max, {})
+
+                self.assertEqual(len(solutions), len(expected_solutions))
+                for solution, expected_solution in zip(solutions, expected_solutions):
+                    self.assertAlmostEqual(solution, expected_solution, delta=equation_utils.ArbitraryEquation.TOLERANCE)
+
+    def test_simple_equations(self):
+        self.assert_solutions("x=3", [3])
+        self.assert_solutions("x^2=4", [-2, 2])
+        self.assert_solutions("2^x=10", [math.log2(10)])
+
+    def test_periodic_equation(self):
+        expected_solutions = [k * math.pi for k in range(-31, 32)]
+
+        self.assert_solutions("sin(x)=0", expected_solutions)
+
+    def test_repeated_roots(self):
+        self.assert_solutions("x^2=0", [0])
+        self.assert_solutions("(x-3)^4=0", [3], (equation_utils.ArbitraryEquation.POLYNOMIAL_METHOD,))
+        self.assert_solutions("(x-1)^2(x+2)^5=0", [-2, 1], (equation_utils.ArbitraryEquation.POLYNOMIAL_METHOD,))
+
+    def test_flat_roots(self):
+        #the equation and its first two derivatives are all 0 at these roots
+        adaptive_method = (equation_utils.ArbitraryEquation.ADAPTIVE_METHOD,)
+
+        self.assert_solutions("sin(x)=x", [0], adaptive_method)
+        self.assert_solutions("x^3=0", [0], adaptive_method)
+        self.assert_solutions("(x-2)^3e^x=0", [2], adaptive_method)
+        self.assert_solutions("x^3cos(x)=0", sorted([0] + [math.pi / 2 + k * math.pi for k in range(-32, 32)]),
+                              adaptive_method)
+
+    def test_roots_at_start_of_domain(self):
+        adaptive_method = (equation_utils.ArbitraryEquation.ADAPTIVE_METHOD,)
+
+        self.assert_solutions("x^0.5=2", [4], adaptive_method)
+        self.assert_solutions("x^(1/3)=2", [8], adaptive_method)
+        self.assert_solutions("(x+50)^0.5=3", [-41], adaptive_method)
+
+    def test_identities(self):
+        for equation_string in ("x=x", "0=0", "sin(x)^2+cos(x)^2=1"):
+            for solve_method in SEARCH_METHODS:
+                with self.subTest(equation=equation_string, solve_method=solve_method):
+                    equation_solver = create_equation_solver(equation_string, solve_method)
+
+                    self.assertEqual(equation_solver.find_all_solutions(-100, 100, {}), [])
+                    self.assertAlmostEqual(equation_solver.get_constant_zero_width(), 200)
+
+    def test_identity_is_not_cached(self):
+        equation_solver = create_equation_solver("x=x", equation_utils.ArbitraryEquation.BRACKETING_METHOD)
+        equation_solver.set_use_solution_cache(True)
+        equation_solver.find_all_solutions(-100, 100, {})
+
+        self.assertEqual(equation_utils.SOLUTION_CACHE.get_size(), 0)
+
+    def test_solution_cache(self):
+        for _ in range(2):
+            equation_solver = create_equation_solver("x^2=4", equation_utils.ArbitraryEquation.BRACKETING_METHOD)
+            equation_solver.set_use_solution_cache(True)
+            solutions = equation_solver.find_all_solutions(-100, 100, {})
+
+        self.assertEqual(len(solutions), 2)
+        self.assertEqual(equation_utils.SOLUTION_CACHE.get_hits(), 1)
+
+
+class TestSolutionSearch(unittest.TestCase):
+    def setUp(self):
+        equation_utils.SOLUTION_CACHE.clear()
+
+    def search(self, equation_string):
+        solution_search = equation_utils.start_solving_equation(equation_string, -100, 100)
+        while not solution_search.is_finished():
+            solution_search.refine(evaluation_budget=100)
+
+        return solution_search
+
+    def test_search_finds_solutions(self):
+        solution_search = self.search("sin(x)=0.5")
+
+        self.assertEqual(len(solution_search.get_solutions()), 63)
+        self.assertFalse(solution_search.has_infinite_solutions())
+
+    def test_identity(self):
+        solution_search = self.search("x=x")
+
+        self.assertEqual(solution_search.get_solutions(), [])
+        self.assertTrue(solution_search.is_always_solved())
+
+    def test_some_values_are_solutions(self):
+        solution_search = self.search("sqrt(x^2)=x")
+
+        self.assertTrue(solution_search.has_infinite_solutions())
+        self.assertFalse(solution_search.is_always_solved())
+
+
+class TestPolynomials(unittest.TestCase):
+    def test_square_free_part(self):
+        #(x-1)^2(x+2) = x^3 - 3x + 2, and its square free part is (x-1)(x+2) = x^2 + x - 2
+        square_free_part = equation_utils.get_square_free_part([2, -3, 0, 1])
+        leading_coefficient = square_free_part[-1]
+
+        self.assertEqual(len(square_free_part), 3)
+        for coefficient, expected_coefficient in zip(square_free_part, [-2, 1, 1]):
+            self.assertAlmostEqual(coefficient / leading_coefficient, expected_coefficient)
+
+    def test_polynomial_coefficients(self):
+        coefficients = equation_utils.get_polynomial_coefficients(calculator_utils.get_expression("x^3-2x"),
+                                                                  calculator_utils.get_expression("-1"),
+                                                                  "x")
+
+        self.assertEqual(coefficients, [1, -2, 0, 1])
+
+    def test_not_a_polynomial(self):
+        self.assertFalse(equation_utils.is_polynomial_equation("sin(x)=0"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import random
+import unittest
+import simul_equation_utils
+
+
+def build_random_items(size):
+    return [[random.uniform(-10, 10) for _ in range(size)] for _ in range(size)]
+
+
+class TestSquareMatrix(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+
+    def assert_items_almost_equal(self, items, expected_items):
+        for row, expected_row in zip(items, expected_items):
+            for item, expected_item in zip(row, expected_row):
+                self.assertAlmostEqual(item, expected_item, places=9)
+
+    def test_determinant_matches_cofactor_determinant(self):
+        for size in range(2, 8):
+            matrix = simul_equation_utils.SquareMatrix(build_random_items(size))
+
+            #the determinants get large, so they are compared relative to their size
+            expected = matrix.cofactor_determinant()
+            self.assertAlmostEqual(matrix.determinant() / expected, 1, places=9)
+
+    def test_determinant_with_row_swaps(self):
+        #the first pivot is 0, so the rows have to be swapped
+        matrix = simul_equation_utils.SquareMatrix([[0, 1, 2], [3, 4, 5], [6, 7, 9]])
+
+        self.assertAlmostEqual(matrix.determinant(), matrix.cofactor_determinant())
+        self.assertAlmostEqual(matrix.determinant(), -3)
+
+    def test_inverse_matches_cofactor_inverse(self):
+        for size in range(2, 7):
+            matrix = simul_equation_utils.SquareMatrix(build_random_items(size))
+
+            self.assert_items_almost_equal(matrix.inverse().get_items(), matrix.cofactor_inverse().get_items())
+
+    def test_inverse_times_matrix_is_identity(self):
+        matrix = simul_equation_utils.SquareMatrix(build_random_items(5))
+        identity_items = [[1 if row_index == col_index else 0 for col_index in range(5)] for row_index in range(5)]
+
+        self.assert_items_almost_equal(matrix.matrix_multiply(matrix.inverse()).get_items(), identity_items)
+
+    def test_transpose_is_a_view(self):
+        matrix = simul_equation_utils.SquareMatrix([[1, 2], [3, 4]])
+        transpose = matrix.transpose()
+
+        self.assertEqual(transpose.get_items(), [[1, 3], [2, 4]])
+
+        matrix.set_item(0, 1, 5)
+        self.assertEqual(transpose.get_item(1, 0), 5)
+
+
+class TestLUDecomposition(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+
+    def test_solve(self):
+        for size in (2, 6, 20):
+            equation_variables = build_random_items(size)
+            known_solution = [random.uniform(-10, 10) for _ in range(size)]
+            equation_constants = [sum(coefficient * value for coefficient, value in zip(variables, known_solution))
+                                  for variables in equation_variables]
+
+            solutions = simul_equation_utils.SystemEquations(equation_variables, equation_constants).solve()
+
+            for solution, value in zip(solutions, known_solution):
+                self.assertAlmostEqual(solution, value, places=8)
+
+    def test_solve_many(self):
+        matrix = simul_equation_utils.SquareMatrix([[2, 1], [1, 3]])
+        decomposition = matrix.lu_decompose()
+
+        for solutions, constants in zip(decomposition.solve_many([[3, 4], [5, 10]]), ([3, 4], [5, 10])):
+            self.assertEqual(solutions, decomposition.solve(constants))
+
+        self.assertEqual([round(value, 12) for value in decomposition.solve([3, 4])], [1, 1])
+
+    def test_singular_matrix(self):
+        matrix = simul_equation_utils.SquareMatrix([[1, 2], [2, 4]])
+        decomposition = matrix.lu_decompose()
+
+        self.assertFalse(decomposition.has_unique_solution())
+        with self.assertRaisesRegex(Exception, "Singular matrix"):
+            decomposition.solve([1, 2])
+
+    def test_ill_conditioned_matrix(self):
+        matrix = simul_equation_utils.SquareMatrix([[1, 1], [1, 1 + 1e-14]])
+
+        with self.assertRaisesRegex(Exception, "Ill-conditioned matrix"):
+            matrix.lu_decompose().solve([1, 2])
+
+
+class TestUpdatedDecomposition(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+
+    def test_update_row_matches_factorising_again(self):
+        items = build_random_items(6)
+        constants = [random.uniform(-10, 10) for _ in range(6)]
+        decomposition = simul_equation_utils.SquareMatrix(items).lu_decompose()
+
+        for row_index in (1, 4, 1):
+            row_change = [random.uniform(-1, 1) for _ in range(6)]
+            items[row_index] = [item + change for item, change in zip(items[row_index], row_change)]
+
+            decomposition = decomposition.update_row(row_index, row_change)
+            refactorised = simul_equation_utils.SquareMatrix(items).lu_decompose()
+
+            for value, expected_value in zip(decomposition.solve(constants), refactorised.solve(constants)):
+                self.assertAlmostEqual(value, expected_value, places=9)
+
+            self.assertAlmostEqual(decomposition.determinant() / refactorised.determinant(), 1, places=9)
+
+    def test_update_to_singular_matrix(self):
+        decomposition = simul_equation_utils.SquareMatrix([[1, 2], [3, 4]]).lu_decompose()
+
+        #the second row becomes twice the first
+        self.assertIsNone(decomposition.update_row(1, [-1, 0]))
+
+    def test_too_many_updates(self):
+        decomposition = simul_equation_utils.SquareMatrix(build_random_items(4)).lu_decompose()
+
+        for _ in range(simul_equation_utils.UpdatedDecomposition.MAX_UPDATES):
+            decomposition = decomposition.update_row(0, [0.1, 0, 0, 0])
+
+        self.assertIsNone(decomposition.update_row(0, [0.1, 0, 0, 0]))
+
+    def test_system_uses_previous_decomposition(self):
+        previous_system = simul_equation_utils.SystemEquations([[2, 1], [1, 3]], [3, 4])
+        previous_system.solve()
+
+        equation_system = simul_equation_utils.SystemEquations([[2, 1], [1, 4]], [3, 5])
+        equation_system.set_previous_system(previous_system)
+
+        self.assertEqual([round(value, 12) for value in equation_system.solve()], [1, 1])
+        self.assertIsInstance(equation_system.get_decomposition(), simul_equation_utils.UpdatedDecomposition)
+
+
+class TestFactorisationCache(unittest.TestCase):
+    def setUp(self):
+        simul_equation_utils.FACTORISATION_CACHE.clear()
+
+    def test_new_system_with_same_coefficients(self):
+        equation_variables = [[2, 1], [1, 3]]
+
+        for equation_constants in ([3, 4], [5, 10]):
+            equation_system = simul_equation_utils.SystemEquations(equation_variables, equation_constants)
+            equation_system.set_use_factorisation_cache(True)
+            equation_system.solve()
+
+        self.assertEqual(simul_equation_utils.FACTORISATION_CACHE.get_hits(), 1)
+        self.assertEqual(simul_equation_utils.FACTORISATION_CACHE.get_misses(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()